@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': "CRM Product Configurator",
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'summary': "Dynamic product configuration in CRM opportunities",
     'description': """
 This module provides product configuration functionality in the CRM pipeline.
@@ -14,13 +14,17 @@ Users can select product variants, manage optional products, and view real-time
     'depends': ['base', 'web','crm_customisation','product_matrix'],
     'data': [
         'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         # 'views/crm_lead_view.xml',
         'views/optional_product_template.xml',
         'views/product_template_views.xml',
+        'views/crm_configurator_metric_views.xml',
     ],
     'images': ['/static/description/icon.png'],
     'assets': {
         'web.assets_backend': [
+            'crm_product_configurator/static/src/js/configurator_codec.js',
+            'crm_product_configurator/static/src/js/configurator_cache.js',
             'crm_product_configurator/static/src/js/crm_product_field.js',
             'crm_product_configurator/static/src/xml/crm_product_template.xml',
             'crm_product_configurator/static/src/js/product_configurator_dialog/product_configurator_dialog.js',
@@ -34,6 +38,9 @@ Users can select product variants, manage optional products, and view real-time
             'crm_product_configurator/static/src/js/product/product.scss',
             'crm_product_configurator/static/src/js/product_template_attribute_line/product_template_attribute_line.scss'
         ],
+        'web.assets_unit_tests': [
+            'crm_product_configurator/static/tests/**/*',
+        ],
     },
     'installable': True,
     'auto_install': False,
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+""" Compact encoding of the product configurator values, decoded by `configurator_codec.js`.
+
+In the compact format, the strings of the values are interned in a `strings` table, and the
+attribute values of each product are indexed in its `ptav_ids` column. The attribute lines are
+encoded as arrays of columns, and the exclusions, archived combinations and parent exclusions
+reference the attribute values by index:
+
+- attribute line: `[id, attribute id, attribute name, display type, create variant, offset of
+  the values in ptav_ids, names, html colors, images, is custom flags, extra prices, indexes of
+  the selected values]`, strings and string columns holding indexes in `strings`, -1 for False;
+- exclusions: `[index of the value, *indexes of the excluded values]`;
+- archived combinations: `[*indexes of the values]`;
+- parent exclusions: `[id of the parent value, *indexes of the excluded values]`.
+"""
+
+COMPACT_FORMAT = 'compact-1'
+# Keys of the products which are encoded, the others being kept as is.
+ENCODED_PRODUCT_KEYS = {
+    'attribute_lines', 'exclusions', 'archived_combinations', 'parent_exclusions',
+}
+
+
+class StringTable:
+    """ Table of the interned strings of the encoded values. """
+
+    def __init__(self):
+        self.strings = []
+        self._indexes = {}
+
+    def intern(self, string):
+        """ Return the index of the string in the table, or -1 if it isn't a string. """
+        if not isinstance(string, str):
+            return -1
+        index = self._indexes.get(string)
+        if index is None:
+            index = self._indexes[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+
+def encode_configurator_values(values):
+    """ Return the `get_values` result encoded in the compact format.
+
+    :param dict values: the result of `get_values`.
+    :rtype: dict
+    """
+    strings = StringTable()
+    encoded_values = dict(
+        values,
+        format=COMPACT_FORMAT,
+        products=[_encode_product(product, strings) for product in values['products']],
+        optional_products=[
+            _encode_product(product, strings) for product in values['optional_products']
+        ],
+    )
+    encoded_values['strings'] = strings.strings
+    return encoded_values
+
+
+def _encode_product(product, strings):
+    ptav_ids = []
+    index_per_ptav_id = {}
+
+    def index(ptav_id):
+        ptav_id = int(ptav_id)
+        if ptav_id not in index_per_ptav_id:
+            index_per_ptav_id[ptav_id] = len(ptav_ids)
+            ptav_ids.append(ptav_id)
+        return index_per_ptav_id[ptav_id]
+
+    attribute_lines = []
+    for ptal in product['attribute_lines']:
+        ptavs = ptal['attribute_values']
+        offset = len(ptav_ids)
+        for ptav in ptavs:
+            index(ptav['id'])
+        attribute_lines.append([
+            ptal['id'],
+            ptal['attribute']['id'],
+            strings.intern(ptal['attribute']['name']),
+            strings.intern(ptal['attribute']['display_type']),
+            strings.intern(ptal['create_variant']),
+            offset,
+            [strings.intern(ptav['name']) for ptav in ptavs],
+            [strings.intern(ptav['html_color']) for ptav in ptavs],
+            [strings.intern(ptav['image']) for ptav in ptavs],
+            [int(bool(ptav['is_custom'])) for ptav in ptavs],
+            [ptav['price_extra'] for ptav in ptavs],
+            [index(ptav_id) for ptav_id in ptal['selected_attribute_value_ids']],
+        ])
+    exclusions = [
+        [index(ptav_id), *map(index, excluded_ids)]
+        for ptav_id, excluded_ids in product['exclusions'].items()
+    ]
+    archived_combinations = [
+        [index(ptav_id) for ptav_id in combination]
+        for combination in product['archived_combinations']
+    ]
+    parent_exclusions = [
+        [int(parent_ptav_id), *map(index, excluded_ids)]
+        for parent_ptav_id, excluded_ids in product['parent_exclusions'].items()
+    ]
+    return dict(
+        {key: value for key, value in product.items() if key not in ENCODED_PRODUCT_KEYS},
+        ptav_ids=ptav_ids,
+        attribute_lines=attribute_lines,
+        exclusions=exclusions,
+        archived_combinations=archived_combinations,
+        parent_exclusions=parent_exclusions,
+    )
@@ -1,16 +1,81 @@
 
 from odoo.http import Controller, request, route
-from odoo import http
+from odoo import api, http
+from odoo.tools import json_default
+import functools
+import json
 import logging
+import threading
+import time
 
-import traceback
+from .configurator_codec import encode_configurator_values
 
 _logger = logging.getLogger(__name__)
 
+# Number of attribute lines sent per chunk of the streamed configurator values.
+STREAM_ATTRIBUTE_LINES_CHUNK_SIZE = 20
+# Number of optional products sent per chunk of the streamed configurator values.
+STREAM_OPTIONAL_PRODUCTS_CHUNK_SIZE = 10
+# Number of attribute values above which `resolve_product` leaves the configurator values out, to
+# let the configurator stream them instead.
+RESOLVE_PRODUCT_MAX_VALUE_COUNT = 500
+
+_instrumentation = threading.local()
+
+
+def instrumented(func):
+    """ Record the performance of the decorated route in `crm.configurator.metric` when the
+    configurator metrics are enabled: its wall time, SQL queries, JSON payload size and the size
+    of the attribute graph of its product template.
+
+    Only the outermost instrumented call of a request is recorded, routes calling each other
+    being measured as a whole. Nothing more than a system parameter lookup is done when the
+    metrics are disabled.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if (
+            getattr(_instrumentation, 'active', False)
+            or not request.env['crm.configurator.metric']._is_enabled()
+        ):
+            return func(self, *args, **kwargs)
+        thread = threading.current_thread()
+        query_count = getattr(thread, 'query_count', 0)
+        query_time = getattr(thread, 'query_time', 0.0)
+        start = time.perf_counter()
+        _instrumentation.active = True
+        try:
+            result = func(self, *args, **kwargs)
+        finally:
+            _instrumentation.active = False
+        duration = time.perf_counter() - start
+        query_count = getattr(thread, 'query_count', 0) - query_count
+        query_time = getattr(thread, 'query_time', 0.0) - query_time
+
+        product_template_id = (
+            kwargs.get('product_template_id')
+            or (kwargs.get('main_product') or {}).get('product_template_id')
+        )
+        product_template = request.env['product.template'].browse(
+            int(product_template_id or 0)
+        ).exists()
+        request.env['crm.configurator.metric'].sudo().create({
+            'route': request.httprequest.path,
+            'product_template_id': product_template.id,
+            'duration': duration * 1000,
+            'query_count': query_count,
+            'query_time': query_time * 1000,
+            'payload_size': len(json.dumps(result, default=json_default).encode()),
+            'graph_size': product_template._get_configurator_graph_size() if product_template else 0,
+        })
+        return result
+    return wrapper
+
 
 class ProductConfiguratorController(Controller):
 
     @route('/crm_product_configurator/get_values', type='json', auth='user')
+    @instrumented
     def get_product_configurator_values(
             self,
             product_template_id,
@@ -20,66 +85,289 @@ class ProductConfiguratorController(Controller):
             company_id=None,
             ptav_ids=None,
             only_main_product=False,
+            lazy_images=True,
+            optional_products_summary=False,
+            optional_products_limit=None,
+            optional_products_offset=0,
+            pricelist_id=None,
+            compact=False,
         ):
         """ Return all product information needed for the product configurator.
+
+        When `lazy_images` is set, the `image` of the attribute values is the URL of the image
+        instead of its content, to let the browser load and cache the images on its own.
+
+        When `optional_products_summary` is set, only a summary of the optional products is
+        returned (see `_get_optional_product_summaries`), their complete information being fetched
+        with `get_optional_product` when they are added. The optional products can be paginated
+        with `optional_products_limit` and `optional_products_offset`, their total number being
+        returned as `optional_products_count`.
+
+        The prices are computed with the pricelist when one is given, see
+        `product.template._get_configurator_price`. `price_depends_on_quantity` tells whether
+        they have to be updated when the quantity changes.
+
+        When `compact` is set, the values are returned in the compact format of
+        `configurator_codec`, to be decoded by the client.
         """
         if company_id:
             request.update_context(allowed_company_ids=[company_id])
         product_template = request.env['product.template'].browse(product_template_id)
-        combination = request.env['product.template.attribute.value']
-        if ptav_ids:
-            combination = request.env['product.template.attribute.value'].browse(ptav_ids).filtered(
-                lambda ptav: ptav.product_tmpl_id.id == product_template_id
-            )
-            # Set missing attributes (unsaved no_variant attributes, or new attribute on existing product)
-            unconfigured_ptals = (
-                    product_template.attribute_line_ids - combination.attribute_line_id).filtered(
-                lambda ptal: ptal.attribute_id.display_type != 'multi')
-            combination += unconfigured_ptals.mapped(
-                lambda ptal: ptal.product_template_value_ids._only_active()[:1]
+        combination = self._get_initial_combination(product_template, ptav_ids)
+        static_data = product_template._get_configurator_static_data(
+            currency_id, lazy_images=lazy_images
+        )
+        optional_product_tmpl_ids = (
+            static_data[product_template.id]['optional_product_tmpl_ids']
+            if not only_main_product else []
+        )
+        optional_product_templates = request.env['product.template'].browse(
+            self._paginate(optional_product_tmpl_ids, optional_products_limit, optional_products_offset)
+        )
+        if optional_products_summary:
+            optional_products = self._get_optional_product_summaries(
+                optional_product_templates,
+                parent_product_tmpl_ids=[product_template.id],
+                currency_id=currency_id,
+                pricelist_id=pricelist_id,
             )
-        if not combination:
-            combination = product_template._get_first_possible_combination()
-        return dict(
-            products=[
-                dict(
-                    **self._get_product_information(
-                        product_template,
-                        combination,
-                        currency_id,
-                        quantity=quantity,
-                        product_uom_id=product_uom_id
-                    ),
-                    parent_product_tmpl_ids=[],
-                )
-            ],
-            optional_products=[
+        else:
+            static_data.update(optional_product_templates._get_configurator_static_data(
+                currency_id, lazy_images=lazy_images
+            ))
+            optional_products = [
                 dict(
                     **self._get_product_information(
                         optional_product_template,
-                        optional_product_template._get_first_possible_combination(
+                        optional_product_template._solve_first_possible_combination(
                             parent_combination=combination
                         ),
                         currency_id,
                         # giving all the ptav of the parent product to get all the exclusions
                         parent_combination=product_template.attribute_line_ids. \
                             product_template_value_ids,
+                        static_data=static_data[optional_product_template.id],
+                        pricelist_id=pricelist_id,
                     ),
                     parent_product_tmpl_ids=[product_template.id],
-                ) for optional_product_template in product_template.optional_product_ids
-            ] if not only_main_product else []
+                ) for optional_product_template in optional_product_templates
+            ]
+        values = dict(
+            products=[
+                dict(
+                    **self._get_product_information(
+                        product_template,
+                        combination,
+                        currency_id,
+                        quantity=quantity,
+                        product_uom_id=product_uom_id,
+                        static_data=static_data[product_template.id],
+                        pricelist_id=pricelist_id,
+                    ),
+                    parent_product_tmpl_ids=[],
+                )
+            ],
+            optional_products=optional_products,
+            optional_products_count=len(optional_product_tmpl_ids),
+            price_depends_on_quantity=product_template._is_configurator_price_quantity_dependent(
+                request.env['product.pricelist'].browse(pricelist_id)
+            ),
+        )
+        return encode_configurator_values(values) if compact else values
+
+    @route('/crm_product_configurator/get_values_batch', type='json', auth='user')
+    @instrumented
+    def get_product_configurator_values_batch(
+            self,
+            products,
+            currency_id=None,
+            company_id=None,
+            pricelist_id=None,
+            only_main_product=True,
+            compact=False,
+    ):
+        """ Return the configurator values of several products at once, to prefetch them.
+
+        The static data of all the templates is fetched first, in one batch, so that the values
+        of each product are then built from the cache.
+
+        :param list products: the products, as dicts with the `product_template_id`, `quantity`,
+            `product_uom_id` and `ptav_ids` keys.
+        :return: the `get_values` result of each product, in the same order as `products`, or
+            None for the products which are not configured with the product configurator.
+        :rtype: list
+        """
+        if company_id:
+            request.update_context(allowed_company_ids=[company_id])
+        product_templates = request.env['product.template'].browse(
+            [product['product_template_id'] for product in products]
         )
+        configurable_templates = product_templates.filtered(
+            lambda template: (template.product_config_mode or 'configurator') == 'configurator'
+                             and template.has_configurable_attributes
+        )
+        configurable_templates._get_configurator_static_data(currency_id)
+        return [
+            self.get_product_configurator_values(
+                product['product_template_id'],
+                product.get('quantity') or 1.0,
+                currency_id=currency_id,
+                product_uom_id=product.get('product_uom_id'),
+                ptav_ids=product.get('ptav_ids'),
+                only_main_product=only_main_product,
+                pricelist_id=pricelist_id,
+                compact=compact,
+            )
+            if product['product_template_id'] in configurable_templates.ids else None
+            for product in products
+        ]
+
+    @route('/crm_product_configurator/get_values_stream', type='http', auth='user', methods=['GET'])
+    def get_product_configurator_values_stream(
+            self,
+            product_template_id,
+            quantity=1,
+            currency_id=None,
+            product_uom_id=None,
+            company_id=None,
+            ptav_ids='',
+            only_main_product=False,
+            optional_products_summary=False,
+            optional_products_limit=None,
+            pricelist_id=None,
+            snapshot_etag=None,
+    ):
+        """ Stream the product configurator values as newline delimited JSON (NDJSON), to let the
+        configurator render progressively instead of waiting for the whole payload.
+
+        The values are sent in chunks, in this order: the main product without its attribute
+        lines and exclusions (`product`), its attribute lines (`attribute_lines`, in several
+        chunks), its exclusions (`exclusions`), the optional products (`optional_products`, in
+        several chunks) and finally `done`. An `error` chunk ends the stream if something fails.
+
+        The parameters are the ones of `get_values`, as query string values, `ptav_ids` being
+        comma-separated. When `snapshot_etag` is the ETag of the up-to-date snapshot of the
+        template (see `snapshot`), the attribute lines and exclusions are replaced by a `snapshot`
+        chunk holding only what depends on the combination: the selected values of each line and
+        the rate of the extra prices, to be applied to the snapshot by the client.
+        """
+        if company_id:
+            request.update_context(allowed_company_ids=[int(company_id)])
+        # The response is sent once the request is over and its cursor closed: the chunks are
+        # computed with a cursor of their own, as the user of the request.
+        registry, uid, context = request.env.registry, request.env.uid, dict(request.env.context)
+        params = dict(
+            product_template_id=int(product_template_id),
+            quantity=float(quantity),
+            currency_id=int(currency_id) if currency_id else None,
+            product_uom_id=int(product_uom_id) if product_uom_id else None,
+            ptav_ids=[int(ptav_id) for ptav_id in ptav_ids.split(',') if ptav_id],
+            only_main_product=only_main_product in ('1', 'true', 'True'),
+            optional_products_summary=optional_products_summary in ('1', 'true', 'True'),
+            optional_products_limit=int(optional_products_limit) if optional_products_limit else None,
+            pricelist_id=int(pricelist_id) if pricelist_id else None,
+            snapshot_etag=snapshot_etag or None,
+        )
+
+        def stream():
+            try:
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, uid, context)
+                    for chunk in self._get_configurator_values_chunks(env, **params):
+                        yield json.dumps(chunk, default=json_default) + '\n'
+            except Exception as e:
+                _logger.exception("[CRM Configurator] Failed to stream the configurator values")
+                yield json.dumps({'type': 'error', 'message': str(e)}) + '\n'
+
+        return request.make_response(stream(), headers=[
+            ('Content-Type', 'application/x-ndjson; charset=utf-8'),
+            ('Cache-Control', 'no-store'),
+            # Ask reverse proxies not to buffer the chunks.
+            ('X-Accel-Buffering', 'no'),
+        ])
+
+    @route('/crm_product_configurator/snapshot', type='http', auth='user', methods=['GET'])
+    def get_product_configurator_snapshot(self, product_template_id):
+        """ Return the configurator snapshot of the template in the language of the user, see
+        `product.template._compile_configurator_snapshots`.
+
+        The snapshot is served with a strong ETag: when it matches the `If-None-Match` header of
+        the request, an empty 304 response is returned instead.
+        """
+        product_template = request.env['product.template'].browse(int(product_template_id))
+        product_template.check_access('read')
+        snapshot = product_template._compile_configurator_snapshots()[product_template.id]
+        headers = [('ETag', f'"{snapshot.checksum}"'), ('Cache-Control', 'no-cache')]
+        if request.httprequest.if_none_match.contains(snapshot.checksum):
+            return request.make_response('', headers=headers, status=304)
+        return request.make_response(
+            snapshot.raw,
+            headers=[('Content-Type', 'application/json; charset=utf-8'), *headers],
+        )
+
+    @route('/crm_product_configurator/resolve_product', type='json', auth='user')
+    @instrumented
+    def resolve_product(
+            self,
+            product_template_id,
+            quantity=1.0,
+            currency_id=None,
+            product_uom_id=None,
+            company_id=None,
+            ptav_ids=None,
+            optional_products_summary=False,
+            optional_products_limit=None,
+            pricelist_id=None,
+            compact=False,
+    ):
+        """ Return everything the CRM product field needs when its template changes, in one call:
+        the single variant of the template if any, its configuration mode and whether it has
+        optional products, plus the configurator values when the configurator has to be opened.
+
+        The configurator values are left out for the templates with more than
+        `RESOLVE_PRODUCT_MAX_VALUE_COUNT` attribute values, which the configurator streams. They
+        are returned in the compact format when `compact` is set, see `get_values`.
+        """
+        if company_id:
+            request.update_context(allowed_company_ids=[company_id])
+        product_template = request.env['product.template'].browse(product_template_id)
+        result = {
+            'has_optional_products': bool(product_template.optional_product_ids),
+            **product_template.get_single_product_variant(),
+            'product_config_mode': product_template.product_config_mode or 'configurator',
+        }
+        if (
+            not result.get('product_id')
+            and result['product_config_mode'] == 'configurator'
+            and sum(product_template.attribute_line_ids.mapped('value_count'))
+                <= RESOLVE_PRODUCT_MAX_VALUE_COUNT
+        ):
+            result['configurator_values'] = self.get_product_configurator_values(
+                product_template_id,
+                quantity,
+                currency_id=currency_id,
+                product_uom_id=product_uom_id,
+                company_id=company_id,
+                ptav_ids=ptav_ids,
+                optional_products_summary=optional_products_summary,
+                optional_products_limit=optional_products_limit,
+                pricelist_id=pricelist_id,
+                compact=compact,
+            )
+        return result
 
     @route('/crm_product_configurator/create_product', type='json', auth='user')
+    @instrumented
     def purchase_product_configurator_create_product(self, product_template_id, combination):
         """ Create the product when there is a dynamic attribute in the combination.
         """
         product_template = request.env['product.template'].browse(product_template_id)
         combination = request.env['product.template.attribute.value'].browse(combination)
-        product = product_template._create_product_variant(combination)
+        product = product_template._get_or_create_product_variant(combination)
         return product.id
 
     @route('/crm_product_configurator/update_combination', type='json', auth='user')
+    @instrumented
     def purchase_product_configurator_update_combination(self, **kwargs):
         """ Return the updated combination information. """
         product_template_id = kwargs.get('product_template_id')
@@ -95,6 +383,7 @@ class ProductConfiguratorController(Controller):
         product_template = request.env['product.template'].browse(product_template_id)
         product_uom = request.env['uom.uom'].browse(product_uom_id)
         currency = request.env['res.currency'].browse(currency_id)
+        pricelist = request.env['product.pricelist'].browse(kwargs.get('pricelist_id'))
         combination = request.env['product.template.attribute.value'].browse(combination)
         product = product_template._get_variant_for_combination(combination)
 
@@ -104,9 +393,53 @@ class ProductConfiguratorController(Controller):
             quantity=quantity or 0.0,
             uom=product_uom,
             currency=currency,
+            pricelist=pricelist,
         )
 
+    @route('/crm_product_configurator/update_combinations', type='json', auth='user')
+    @instrumented
+    def purchase_product_configurator_update_combinations(self, products, **kwargs):
+        """ Return the updated information of several combinations at once.
+
+        :param list products: the combinations to update, as dicts with the
+            `product_template_id`, `combination` and `quantity` keys.
+        :return: the information of each combination, in the same order as `products`.
+        :rtype: list
+        """
+        company_id = kwargs.get('company_id')
+        if company_id:
+            request.update_context(allowed_company_ids=[company_id])
+
+        product_uom = request.env['uom.uom'].browse(kwargs.get('product_uom_id'))
+        currency = request.env['res.currency'].browse(kwargs.get('currency_id'))
+        pricelist = request.env['product.pricelist'].browse(kwargs.get('pricelist_id'))
+        product_templates = request.env['product.template'].browse(
+            [product['product_template_id'] for product in products]
+        )
+        combinations = request.env['product.template.attribute.value'].browse(
+            [ptav_id for product in products for ptav_id in product['combination']]
+        )
+        results = []
+        for product_data in products:
+            product_template = product_templates.browse(
+                product_data['product_template_id']
+            ).with_prefetch(product_templates._prefetch_ids)
+            combination = combinations.browse(product_data['combination']).with_prefetch(
+                combinations._prefetch_ids
+            )
+            product = product_template._get_variant_for_combination(combination)
+            results.append(self._get_basic_product_information(
+                product or product_template,
+                combination,
+                quantity=product_data.get('quantity') or 0.0,
+                uom=product_uom,
+                currency=currency,
+                pricelist=pricelist,
+            ))
+        return results
+
     @route('/crm_product_configurator/get_optional_products', type='json', auth='user')
+    @instrumented
     def purchase_product_configurator_get_optional_products(
             self,
             product_template_id,
@@ -114,8 +447,18 @@ class ProductConfiguratorController(Controller):
             parent_combination,
             currency_id = None,
             company_id=None,
+            lazy_images=True,
+            summary=False,
+            limit=None,
+            offset=0,
+            pricelist_id=None,
     ):
         """ Return information about optional products for the given `product.template`.
+
+        :param bool summary: whether to only return a summary of the optional products, see
+            `_get_optional_product_summaries`.
+        :param int limit: the maximum number of optional products to return, if any.
+        :param int offset: the number of optional products to skip.
         """
         if company_id:
             request.update_context(allowed_company_ids=[company_id])
@@ -123,20 +466,71 @@ class ProductConfiguratorController(Controller):
         parent_combination = request.env['product.template.attribute.value'].browse(
             parent_combination + combination
         )
+        optional_product_templates = request.env['product.template'].browse(
+            self._paginate(product_template.optional_product_ids.ids, limit, offset)
+        )
+        if summary:
+            return self._get_optional_product_summaries(
+                optional_product_templates,
+                parent_product_tmpl_ids=[product_template.id],
+                currency_id=currency_id,
+                pricelist_id=pricelist_id,
+            )
+        static_data = optional_product_templates._get_configurator_static_data(
+            currency_id, lazy_images=lazy_images
+        )
         return [
             dict(
                 **self._get_product_information(
                     optional_product_template,
-                    optional_product_template._get_first_possible_combination(
+                    optional_product_template._solve_first_possible_combination(
                         parent_combination=parent_combination
                     ),
                     currency_id,
-                    parent_combination=parent_combination
+                    parent_combination=parent_combination,
+                    static_data=static_data[optional_product_template.id],
+                    pricelist_id=pricelist_id,
                 ),
                 parent_product_tmpl_ids=[product_template.id],
-            ) for optional_product_template in product_template.optional_product_ids
+            ) for optional_product_template in optional_product_templates
         ]
 
+    @route('/crm_product_configurator/get_optional_product', type='json', auth='user')
+    @instrumented
+    def purchase_product_configurator_get_optional_product(
+            self,
+            product_template_id,
+            parent_combination,
+            currency_id=None,
+            company_id=None,
+            lazy_images=True,
+            pricelist_id=None,
+    ):
+        """ Return the complete information of an optional product whose summary was loaded, when
+        it is added to the products.
+
+        The `parent_product_tmpl_ids` and `quantity` of the optional product are left out, they
+        are kept from its summary.
+        """
+        if company_id:
+            request.update_context(allowed_company_ids=[company_id])
+        product_template = request.env['product.template'].browse(product_template_id)
+        parent_combination = request.env['product.template.attribute.value'].browse(
+            parent_combination
+        )
+        information = self._get_product_information(
+            product_template,
+            product_template._solve_first_possible_combination(parent_combination=parent_combination),
+            currency_id,
+            parent_combination=parent_combination,
+            static_data=product_template._get_configurator_static_data(
+                currency_id, lazy_images=lazy_images
+            )[product_template.id],
+            pricelist_id=pricelist_id,
+        )
+        del information['quantity']
+        return information
+
     # @http.route('/crm_product_configurator/save_to_crm', type='json', auth='user', methods=['POST'])
     # def save_to_crm(self, **kwargs):
     #     main_product = kwargs.get('main_product')
@@ -196,12 +590,13 @@ class ProductConfiguratorController(Controller):
     #     return {'success': True}
 
     @http.route('/crm_product_configurator/save_to_crm', type='json', auth='user', methods=['POST'])
+    @instrumented
     def save_to_crm(self, **kwargs):
         main_product = kwargs.get('main_product')
         optional_products = kwargs.get('optional_products', [])
         crm_lead_id = kwargs.get('crm_lead_id')
 
-        _logger.info(f"[CRM Configurator] Received payload with lead_id={crm_lead_id}")
+        _logger.info("[CRM Configurator] Received payload with lead_id=%s", crm_lead_id)
 
         if not crm_lead_id or not main_product:
             return {'error': 'Missing required data: crm_lead_id or main_product'}
@@ -210,163 +605,164 @@ class ProductConfiguratorController(Controller):
         if not lead.exists():
             return {'error': 'Lead not found'}
 
-        def create_or_update_material_line(product_data, lead):
-            try:
-                ptav_ids = list(map(int, product_data.get('ptav_ids', [])))
-                template_id = int(product_data.get('product_template_id'))
-                quantity = float(product_data.get('quantity', 1.0))
-                product_id = product_data.get('product_id')
-
-                if not product_id:
-                    _logger.warning(f"[CRM Configurator] Skipping: No product_id for template_id={template_id}")
-                    return
-
-                # Clean up any blank lines (no product selected)
-                request.env['crm.material.line'].sudo().search([
-                    ('lead_id', '=', lead.id),
-                    ('product_id', '=', False)
-                ]).unlink()
-
-                # ✅ GET PRODUCT WITH SAFETY CHECKS
-                product_variant = request.env['product.product'].sudo().browse(int(product_id))
-                if not product_variant.exists():
-                    raise ValueError(f"Product ID {product_id} not found")
-
-                # ✅ CRITICAL: Ensure product has template
-                if not product_variant.product_tmpl_id:
-                    _logger.error(f"Product {product_id} has no template!")
-                    return {'error': f'Product {product_id} is invalid (no template)'}
-
-                template = product_variant.product_tmpl_id
-
-                # ✅ Verify template ID matches
-                if template.id != template_id:
-                    _logger.warning(f"Template ID mismatch: expected {template_id}, got {template.id}")
-
-                # ✅ Get UOM with fallback
-                uom_id = product_variant.uom_id.id if product_variant.uom_id else False
-                if not uom_id:
-                    _logger.warning(f"Product {product_id} has no UOM, using default")
-                    uom_id = request.env.ref('uom.product_uom_unit', raise_if_not_found=False)
-                    if uom_id:
-                        uom_id = uom_id.id
-
-                # ✅ Get category
-                category_id = template.categ_id.id if template.categ_id else False
-
-                # ✅ Build attribute description
-                attribute_values = product_variant.product_template_attribute_value_ids
-
-                attribute_lines = []
-                for attr_value in attribute_values:
-                    attribute_lines.append(f"• {attr_value.attribute_id.name}: {attr_value.name}")
-
-                attribute_description = "\n".join(attribute_lines) if attribute_lines else ""
-
-                # Build display name
-                if product_variant.default_code:
-                    base_name = f"[{product_variant.default_code}] {product_variant.name}"
-                else:
-                    base_name = product_variant.name
-
-                attributes_summary = ", ".join(attr.name for attr in attribute_values)
-                product_display_name = f"{base_name} ({attributes_summary})" if attributes_summary else base_name
-
-                # Build attribute summary
-                attribute_summary = ", ".join(
-                    f"{attr.attribute_id.name}: {attr.name}" for attr in attribute_values
+        try:
+            # Save the main and optional products in one batch, which is rolled back as a whole
+            # on error while the rest of the request transaction carries on.
+            with request.env.cr.savepoint():
+                request.env['crm.material.line'].sudo()._save_configurator_products(
+                    lead, [main_product, *optional_products]
                 )
+            return {'success': True}
 
-                # Build description
-                base_description = product_variant.description_sale or template.description_sale or ""
-                if attribute_description:
-                    if base_description:
-                        full_description = f"{base_description}\n\n📋 Selected Attributes:\n{attribute_description}"
-                    else:
-                        full_description = f"📋 Selected Attributes:\n{attribute_description}"
-                else:
-                    full_description = base_description
-
-                # ✅ Check for existing line
-                def _get_existing_line(lead, template, ptav_ids):
-                    lines = request.env['crm.material.line'].sudo().search([
-                        ('lead_id', '=', lead.id),
-                        ('product_template_id', '=', template.id),
-                    ], limit=1)
-                    for line in lines:
-                        if line.product_id:
-                            existing_ptav_ids = set(line.product_id.product_template_attribute_value_ids.ids)
-                            if set(ptav_ids) == existing_ptav_ids:
-                                return line
-                    return False
-
-                existing_line = _get_existing_line(lead, template, ptav_ids)
-
-                # ✅ Prepare line values - ONLY safe fields
-                line_vals = {
-                    'product_id': product_variant.id,
-                    'quantity': quantity if quantity > 0 else 1.0,
-                    'product_template_id': template.id,  # Always set from product's template
-                    'product_template_attribute_value_ids': [(6, 0, ptav_ids)],
-                }
-
-                # Add optional fields only if they have values
-                if uom_id:
-                    line_vals['product_uom_id'] = uom_id
-                if category_id:
-                    line_vals['product_category_id'] = category_id
-                if product_display_name:
-                    line_vals['product_display_name'] = product_display_name
-                if attribute_summary:
-                    line_vals['attribute_summary'] = attribute_summary
-                if full_description:
-                    line_vals['description'] = full_description
-
-                # ✅ Create or Update
-                if existing_line:
-                    _logger.info(f"[CRM Configurator] Updating line {existing_line.id}: {product_display_name}")
-                    existing_line.write(line_vals)
-                else:
-                    _logger.info(f"[CRM Configurator] Creating new line: {product_display_name}")
-
-                    # Check if there's an empty line to update
-                    last_line = request.env['crm.material.line'].sudo().search([
-                        ('lead_id', '=', lead.id),
-                        ('product_id', '=', False)
-                    ], order='id desc', limit=1)
-
-                    if last_line:
-                        # Update empty line
-                        last_line.write(line_vals)
-                    else:
-                        # Create new line
-                        line_vals['lead_id'] = lead.id
-                        new_line = request.env['crm.material.line'].sudo().create(line_vals)
-                        _logger.info(f"[CRM Configurator] Created line ID: {new_line.id}")
+        except Exception as e:
+            _logger.exception("[CRM Configurator] Fatal error: %r", e)
+            return {'success': False, 'error': str(e)}
+    
+        
+    def _get_configurator_values_chunks(
+            self,
+            env,
+            product_template_id,
+            quantity,
+            currency_id=None,
+            product_uom_id=None,
+            ptav_ids=None,
+            only_main_product=False,
+            optional_products_summary=False,
+            optional_products_limit=None,
+            pricelist_id=None,
+            snapshot_etag=None,
+    ):
+        """ Generate the chunks of the streamed configurator values, see `get_values_stream`.
 
-            except Exception as e:
-                _logger.error(f"[CRM Configurator] Error: {repr(e)}\n{traceback.format_exc()}")
-                raise
+        Each chunk is computed right before being yielded, the cheapest ones first.
 
-        try:
-            # Save main product
-            create_or_update_material_line(main_product, lead)
+        :param env: the environment to compute the chunks with.
+        """
+        product_template = env['product.template'].browse(product_template_id)
+        product_uom = env['uom.uom'].browse(product_uom_id)
+        currency = env['res.currency'].browse(currency_id)
+        pricelist = env['product.pricelist'].browse(pricelist_id)
+        combination = self._get_initial_combination(product_template, ptav_ids)
+        product = product_template._get_variant_for_combination(combination)
+        yield dict(
+            type='product',
+            price_depends_on_quantity=product_template._is_configurator_price_quantity_dependent(
+                pricelist
+            ),
+            product=dict(
+                product_tmpl_id=product_template.id,
+                **self._get_basic_product_information(
+                    product or product_template,
+                    combination,
+                    quantity=quantity,
+                    uom=product_uom,
+                    currency=currency,
+                    pricelist=pricelist,
+                ),
+                quantity=quantity,
+                attribute_lines=[],
+                exclusions={},
+                archived_combinations=[],
+                parent_exclusions={},
+                parent_product_tmpl_ids=[],
+            ),
+        )
 
-            # Save optional products
-            for opt in optional_products:
-                create_or_update_material_line(opt, lead)
+        static_data = product_template._get_configurator_static_data(currency_id)[
+            product_template.id
+        ]
+        price_extra_rate = product_template._get_configurator_price_extra_rate(
+            product_uom, currency
+        )
+        snapshot = (
+            # The exclusions of the snapshot don't apply to combinations with archived values.
+            snapshot_etag and all(combination.mapped('ptav_active'))
+            and product_template._get_configurator_snapshots().get(product_template.id)
+        )
+        if snapshot and snapshot_etag == snapshot.checksum:
+            yield dict(
+                type='snapshot',
+                etag=snapshot.checksum,
+                selected_attribute_value_ids=self._get_selected_ptav_ids_per_line(combination),
+                price_extra_rate=price_extra_rate,
+            )
+        else:
+            attribute_lines = self._get_attribute_lines_information(
+                static_data, combination, price_extra_rate=price_extra_rate
+            )
+            for index in range(0, len(attribute_lines), STREAM_ATTRIBUTE_LINES_CHUNK_SIZE):
+                yield dict(
+                    type='attribute_lines',
+                    attribute_lines=attribute_lines[index:index + STREAM_ATTRIBUTE_LINES_CHUNK_SIZE],
+                )
+            yield dict(
+                type='exclusions',
+                **self._get_exclusions_information(product_template, combination, None, static_data),
+            )
 
-            # Ensure changes are committed
-            request.env.cr.commit()
+        optional_product_tmpl_ids = (
+            static_data['optional_product_tmpl_ids'] if not only_main_product else []
+        )
+        optional_product_templates = env['product.template'].browse(
+            self._paginate(optional_product_tmpl_ids, optional_products_limit)
+        )
+        for index in range(0, len(optional_product_templates), STREAM_OPTIONAL_PRODUCTS_CHUNK_SIZE):
+            templates = optional_product_templates[index:index + STREAM_OPTIONAL_PRODUCTS_CHUNK_SIZE]
+            if optional_products_summary:
+                optional_products = self._get_optional_product_summaries(
+                    templates,
+                    parent_product_tmpl_ids=[product_template.id],
+                    currency_id=currency_id,
+                    pricelist_id=pricelist_id,
+                )
+            else:
+                optional_static_data = templates._get_configurator_static_data(currency_id)
+                optional_products = [
+                    dict(
+                        **self._get_product_information(
+                            optional_product_template,
+                            optional_product_template._solve_first_possible_combination(
+                                parent_combination=combination
+                            ),
+                            currency_id,
+                            # giving all the ptav of the parent product to get all the exclusions
+                            parent_combination=product_template.attribute_line_ids. \
+                                product_template_value_ids,
+                            static_data=optional_static_data[optional_product_template.id],
+                            pricelist_id=pricelist_id,
+                        ),
+                        parent_product_tmpl_ids=[product_template.id],
+                    ) for optional_product_template in templates
+                ]
+            yield dict(
+                type='optional_products',
+                optional_products=optional_products,
+                optional_products_count=len(optional_product_tmpl_ids),
+            )
+        yield dict(type='done')
 
-            return {'success': True}
+    def _get_initial_combination(self, product_template, ptav_ids=None):
+        """ Return the combination the configurator opens with: the given PTAVs of the template,
+        completed with the first active value of the lines they miss, or the first possible
+        combination of the template when no PTAV is given.
+        """
+        combination = product_template.env['product.template.attribute.value']
+        if ptav_ids:
+            combination = combination.browse(ptav_ids).filtered(
+                lambda ptav: ptav.product_tmpl_id == product_template
+            )
+            # Set missing attributes (unsaved no_variant attributes, or new attribute on existing product)
+            unconfigured_ptals = (
+                    product_template.attribute_line_ids - combination.attribute_line_id).filtered(
+                lambda ptal: ptal.attribute_id.display_type != 'multi')
+            combination += unconfigured_ptals.mapped(
+                lambda ptal: ptal.product_template_value_ids._only_active()[:1]
+            )
+        if not combination:
+            combination = product_template._solve_first_possible_combination()
+        return combination
 
-        except Exception as e:
-            _logger.error(f"[CRM Configurator] Fatal error: {repr(e)}")
-            request.env.cr.rollback()
-            return {'success': False, 'error': str(e)}
-    
-        
     def _get_product_information(
             self,
             product_template,
@@ -375,15 +771,26 @@ class ProductConfiguratorController(Controller):
             quantity=1,
             product_uom_id=None,
             parent_combination=None,
+            static_data=None,
+            pricelist_id=None,
     ):
         """ Return complete information about a product.
+
+        :param dict static_data: the static data of the template, as returned by
+            `_get_configurator_static_data`. Fetched when not given.
+        :param int pricelist_id: the pricelist of the prices, if any.
         """
-        product_uom = request.env['uom.uom'].browse(product_uom_id)
-        currency = request.env['res.currency'].browse(currency_id)
+        env = product_template.env
+        product_uom = env['uom.uom'].browse(product_uom_id)
+        currency = env['res.currency'].browse(currency_id)
+        pricelist = env['product.pricelist'].browse(pricelist_id)
         product = product_template._get_variant_for_combination(combination)
-        attribute_exclusions = product_template._get_attribute_exclusions(
-            parent_combination=parent_combination,
-            combination_ids=combination.ids,
+        if static_data is None:
+            static_data = product_template._get_configurator_static_data(currency_id)[
+                product_template.id
+            ]
+        attribute_exclusions = self._get_exclusions_information(
+            product_template, combination, parent_combination, static_data
         )
         return dict(
             product_tmpl_id=product_template.id,
@@ -392,30 +799,142 @@ class ProductConfiguratorController(Controller):
                 combination,
                 quantity=quantity,
                 uom=product_uom,
-                currency=currency
+                currency=currency,
+                pricelist=pricelist,
             ),
             quantity=quantity,
-            attribute_lines=[dict(
-                id=ptal.id,
-                attribute=dict(**ptal.attribute_id.read(['id', 'name', 'display_type'])[0]),
-                attribute_values=[
-                    dict(
-                        **ptav.read(['name', 'html_color', 'image', 'is_custom'])[0],
-                    ) for ptav in ptal.product_template_value_ids
-                    if ptav.ptav_active or combination and ptav.id in combination.ids
-                ],
-                selected_attribute_value_ids=combination.filtered(
-                    lambda c: ptal in c.attribute_line_id
-                ).ids,
-                create_variant=ptal.attribute_id.create_variant,
-            ) for ptal in product_template.attribute_line_ids],
+            attribute_lines=self._get_attribute_lines_information(
+                static_data,
+                combination,
+                price_extra_rate=product_template._get_configurator_price_extra_rate(
+                    product_uom, currency
+                ),
+            ),
             exclusions=attribute_exclusions['exclusions'],
             archived_combinations=attribute_exclusions['archived_combinations'],
             parent_exclusions=attribute_exclusions['parent_exclusions'],
         )
 
+    def _get_exclusions_information(
+            self, product_template, combination, parent_combination, static_data
+    ):
+        """ Return the exclusions, archived combinations and parent exclusions of the template
+        for the given combination.
+
+        :param dict static_data: the static data of the template, as returned by
+            `_get_configurator_static_data`.
+        :rtype: dict
+        """
+        if all(combination.mapped('ptav_active')):
+            # Own exclusions and archived combinations only depend on the combination when it
+            # contains archived values, they can be taken from the static data otherwise.
+            return dict(
+                exclusions=static_data['exclusions'],
+                archived_combinations=static_data['archived_combinations'],
+                parent_exclusions=product_template._get_parent_attribute_exclusions(
+                    parent_combination or product_template.env['product.template.attribute.value']
+                ),
+            )
+        exclusions = product_template._get_attribute_exclusions(
+            parent_combination=parent_combination,
+            combination_ids=combination.ids,
+        )
+        return dict(
+            exclusions=exclusions['exclusions'],
+            archived_combinations=exclusions['archived_combinations'],
+            parent_exclusions=exclusions['parent_exclusions'],
+        )
+
+    def _get_attribute_lines_information(self, static_data, combination, price_extra_rate=1.0):
+        """ Return the attribute lines of the template with the values selected in the given
+        combination.
+
+        :param dict static_data: the static data of the template, as returned by
+            `_get_configurator_static_data`.
+        :param float price_extra_rate: the rate converting the extra prices of the values to the
+            currency and UoM of the configurator, see `_get_configurator_price_extra_rate`.
+        :rtype: list
+        """
+        selected_ptav_ids_per_line = self._get_selected_ptav_ids_per_line(combination)
+        return [
+            dict(
+                id=ptal['id'],
+                attribute=ptal['attribute'],
+                attribute_values=[
+                    dict(
+                        id=ptav['id'],
+                        name=ptav['name'],
+                        html_color=ptav['html_color'],
+                        image=ptav['image'],
+                        is_custom=ptav['is_custom'],
+                        price_extra=ptav['price_extra'] * price_extra_rate,
+                    ) for ptav in ptal['attribute_values']
+                    if ptav['ptav_active'] or ptav['id'] in selected_ptav_ids_per_line.get(ptal['id'], [])
+                ],
+                selected_attribute_value_ids=selected_ptav_ids_per_line.get(ptal['id'], []),
+                create_variant=ptal['create_variant'],
+            ) for ptal in static_data['attribute_lines']
+        ]
+
+    @staticmethod
+    def _get_selected_ptav_ids_per_line(combination):
+        """ Return the ids of the values of the combination, indexed by attribute line id. """
+        selected_ptav_ids_per_line = {}
+        for ptav in combination:
+            selected_ptav_ids_per_line.setdefault(ptav.attribute_line_id.id, []).append(ptav.id)
+        return selected_ptav_ids_per_line
+
+    def _get_optional_product_summaries(
+            self, product_templates, parent_product_tmpl_ids, currency_id=None, pricelist_id=None
+    ):
+        """ Return a summary of the given optional products: their name, description, price and
+        image URL, without their attribute lines and exclusions.
+
+        The summaries are read at once, at a cost which doesn't depend on the attributes of the
+        products. They have the shape of the complete information of the products, flagged with
+        `is_summary`.
+
+        :param product_templates: the `product.template` of the optional products.
+        :param list parent_product_tmpl_ids: the ids of the parent templates of the products.
+        :param int currency_id: the currency of the prices, if any.
+        :param int pricelist_id: the pricelist of the prices, if any.
+        :rtype: list
+        """
+        env = product_templates.env
+        currency = env['res.currency'].browse(currency_id)
+        pricelist = env['product.pricelist'].browse(pricelist_id)
+        no_combination = env['product.template.attribute.value']
+        return [
+            dict(
+                product_tmpl_id=values['id'],
+                id=False,
+                display_name=values['display_name'],
+                description_sale=values['description_sale'],
+                price=product_templates.browse(values['id'])._get_configurator_price(
+                    no_combination, currency=currency, pricelist=pricelist
+                ),
+                imageURL=f"/web/image/product.template/{values['id']}/image_128",
+                quantity=1,
+                attribute_lines=[],
+                exclusions={},
+                archived_combinations=[],
+                parent_exclusions={},
+                parent_product_tmpl_ids=list(parent_product_tmpl_ids),
+                is_summary=True,
+            ) for values in product_templates.read(['display_name', 'description_sale'])
+        ]
+
+    @staticmethod
+    def _paginate(ids, limit=None, offset=0):
+        """ Return the page of `ids` given by `limit` and `offset`. """
+        offset = offset or 0
+        return ids[offset:offset + limit] if limit else ids[offset:]
+
     def _get_basic_product_information(self, product_or_template, combination, **kwargs):
         """ Return basic information about a product
+
+        The price is given by `product.template._get_configurator_price`, for the `quantity`,
+        `uom`, `currency` and `pricelist` given in the keyword arguments.
         """
         basic_information = dict(
             **product_or_template.read(['description_sale', 'display_name'])[0]
@@ -430,7 +949,18 @@ class ProductConfiguratorController(Controller):
                 basic_information.update(
                     display_name=f"{basic_information['display_name']} ({combination_name})"
                 )
+        if product_or_template.is_product_variant:
+            product_template, product = product_or_template.product_tmpl_id, product_or_template
+        else:
+            product_template, product = product_or_template, None
         return dict(
             **basic_information,
-            price=product_or_template.standard_price
+            price=product_template._get_configurator_price(
+                combination,
+                product=product,
+                quantity=kwargs.get('quantity') or 1.0,
+                uom=kwargs.get('uom'),
+                currency=kwargs.get('currency'),
+                pricelist=kwargs.get('pricelist'),
+            ),
         )
\ No newline at end of file
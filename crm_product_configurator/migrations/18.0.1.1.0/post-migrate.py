@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+from odoo.tools import split_every
+
+
+def migrate(cr, version):
+    """ Backfill the `combination_key` of the existing material lines. """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    MaterialLine = env['crm.material.line'].with_context(active_test=False)
+    cr.execute("SELECT id FROM crm_material_line WHERE combination_key IS NULL ORDER BY id")
+    for line_ids in split_every(1000, [row[0] for row in cr.fetchall()]):
+        lines = MaterialLine.browse(line_ids)
+        env.add_to_compute(MaterialLine._fields['combination_key'], lines)
+        MaterialLine.flush_model(['combination_key'])
+        env.invalidate_all()
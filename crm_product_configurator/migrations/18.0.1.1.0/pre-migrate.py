@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+
+
+def migrate(cr, version):
+    """ Create the `combination_key` column beforehand, so that it is not computed for all the
+    existing material lines at once when the field is set up, but in batches by the post-migration.
+    """
+    cr.execute("ALTER TABLE crm_material_line ADD COLUMN IF NOT EXISTS combination_key VARCHAR")
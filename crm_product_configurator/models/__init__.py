@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
 
+from . import crm_configurator_metric
+from . import crm_configurator_metric_report
 # from . import crm_lead
 from . import crm_lead_line
 from . import product_attribute_custom_value
+from . import product_product
 from . import product_template
+from . import product_template_attribute_exclusion
+from . import product_template_attribute_line
+from . import product_template_attribute_value
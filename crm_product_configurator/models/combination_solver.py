@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+
+
+class CombinationSolver:
+    """ Constraint solver enumerating the combinations of the attribute lines of a product
+    template which satisfy its exclusions.
+
+    Each attribute line is a variable whose domain is the ids of its values, in their order of
+    preference. Two values excluding each other can't be selected together.
+
+    The domains are pruned with arc consistency, which is maintained while the lines are
+    assigned one after the other, in order. The solutions are thus generated in the order of the
+    lines and values, as with the enumeration of the ORM, but without going through the
+    combinations which can't lead to a solution.
+
+    The constraints of the variants are left to the caller, which checks the solutions lazily:
+    compiling them would mean loading all the variants of the template.
+    """
+
+    def __init__(self, domains, exclusions=None):
+        """
+        :param list domains: the value ids of each line, in their order of preference.
+        :param dict exclusions: the ids of the values excluded by each value id.
+        """
+        self.domains = [list(domain) for domain in domains]
+        self.exclusions = defaultdict(set)
+        for value_id, excluded_ids in (exclusions or {}).items():
+            for excluded_id in excluded_ids:
+                self.exclusions[value_id].add(excluded_id)
+                self.exclusions[excluded_id].add(value_id)
+
+    def solve(self):
+        """ Return the first solution, as a list of one value id per line, or None if there is
+        none.
+        """
+        return next(self.solutions(), None)
+
+    def solutions(self):
+        """ Generate the solutions, as lists of one value id per line, in order. """
+        domains = self._propagate([set(domain) for domain in self.domains])
+        if domains is not None:
+            yield from self._search(domains, 0)
+
+    def _search(self, domains, line):
+        if line == len(domains):
+            yield [next(iter(domain)) for domain in domains]
+            return
+        for value_id in self.domains[line]:
+            if value_id not in domains[line]:
+                continue
+            assigned_domains = self._propagate(
+                domains[:line] + [{value_id}] + domains[line + 1:]
+            )
+            if assigned_domains is not None:
+                yield from self._search(assigned_domains, line + 1)
+
+    def _propagate(self, domains):
+        """ Prune the domains until they are arc consistent.
+
+        :return: the pruned domains, or None if a domain becomes empty.
+        """
+        domains = [set(domain) for domain in domains]
+        if not self.exclusions:
+            return domains if all(domains) else None
+        changed = True
+        while changed:
+            changed = False
+            # A value is not supported by a line when it excludes all the values of the line.
+            for line, domain in enumerate(domains):
+                for value_id in list(domain):
+                    excluded_ids = self.exclusions.get(value_id)
+                    if excluded_ids and any(
+                        other_domain <= excluded_ids
+                        for other_line, other_domain in enumerate(domains)
+                        if other_line != line
+                    ):
+                        domain.discard(value_id)
+                        changed = True
+                if not domain:
+                    return None
+        return domains
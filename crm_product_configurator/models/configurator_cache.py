@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+
+
+class ConfiguratorPayloadCache:
+    """ Process-local LRU cache for the static part of the product configurator payload.
+
+    Entries are keyed on the template id, the request context and the write dates of the catalog
+    records the payload is built from, so that a stale entry is never returned, even when the
+    catalog is modified by another worker. Writes done in this process additionally evict the
+    entries of the modified templates to free their memory early.
+    """
+
+    def __init__(self, max_size=128):
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def resize(self, max_size):
+        with self._lock:
+            self.max_size = max_size
+            self._evict()
+
+    def invalidate(self, template_ids=None):
+        """ Drop the entries of the given templates, or all the entries if none is given.
+
+        :param template_ids: ids of `product.template` records, or None.
+        """
+        with self._lock:
+            if template_ids is None:
+                self._entries.clear()
+                return
+            template_ids = set(template_ids)
+            for key in [key for key in self._entries if key[0] in template_ids]:
+                del self._entries[key]
+
+    def get_stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self):
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
+
+
+payload_cache = ConfiguratorPayloadCache()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import api, fields, models
+
+METRICS_ENABLED_PARAM = 'crm_product_configurator.metrics_enabled'
+# Number of days the metrics are kept for.
+METRICS_RETENTION_DAYS = 30
+
+
+class CrmConfiguratorMetric(models.Model):
+    """
+    Performance measure of a call to a route of the product configurator, recorded when the
+    `crm_product_configurator.metrics_enabled` system parameter is set.
+    """
+    _name = 'crm.configurator.metric'
+    _description = "CRM Product Configurator Metric"
+    _order = 'id desc'
+
+    route = fields.Char(string="Route", required=True, index=True, readonly=True)
+    product_template_id = fields.Many2one(
+        comodel_name='product.template',
+        string="Product Template",
+        ondelete='set null',
+        readonly=True,
+    )
+    duration = fields.Float(string="Duration (ms)", readonly=True, help="Wall time of the call")
+    query_count = fields.Integer(string="Queries", readonly=True)
+    query_time = fields.Float(string="Query Time (ms)", readonly=True)
+    payload_size = fields.Integer(
+        string="Payload Size (bytes)", readonly=True, help="Size of the JSON response"
+    )
+    graph_size = fields.Integer(
+        string="Attribute Graph Size",
+        readonly=True,
+        help="Number of attribute values and exclusions of the product template",
+    )
+
+    @api.model
+    def _is_enabled(self):
+        """ Return whether the configurator metrics are recorded. """
+        return bool(self.env['ir.config_parameter'].sudo().get_param(METRICS_ENABLED_PARAM))
+
+    @api.autovacuum
+    def _gc_metrics(self):
+        """ Delete the metrics older than `METRICS_RETENTION_DAYS` days. """
+        self.search([
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=METRICS_RETENTION_DAYS)),
+        ]).unlink()
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+
+from odoo import _, api, fields, models, tools
+from odoo.exceptions import AccessError
+
+_logger = logging.getLogger(__name__)
+
+METRIC_BUDGETS_PARAM = 'crm_product_configurator.metric_budgets'
+REPORT_FIELDS = [
+    'call_count',
+    'duration_p50',
+    'duration_p90',
+    'duration_p99',
+    'query_count_p50',
+    'query_count_p90',
+    'query_time_p90',
+    'payload_size_p90',
+    'graph_size_max',
+]
+
+
+class CrmConfiguratorMetricReport(models.Model):
+    """
+    Percentiles of the metrics of each route of the product configurator.
+    """
+    _name = 'crm.configurator.metric.report'
+    _description = "CRM Product Configurator Metric Percentiles"
+    _auto = False
+    _order = 'duration_p90 desc'
+
+    route = fields.Char(string="Route", readonly=True)
+    call_count = fields.Integer(string="Calls", readonly=True)
+    duration_p50 = fields.Float(string="Duration p50 (ms)", readonly=True)
+    duration_p90 = fields.Float(string="Duration p90 (ms)", readonly=True)
+    duration_p99 = fields.Float(string="Duration p99 (ms)", readonly=True)
+    query_count_p50 = fields.Float(string="Queries p50", readonly=True)
+    query_count_p90 = fields.Float(string="Queries p90", readonly=True)
+    query_time_p90 = fields.Float(string="Query Time p90 (ms)", readonly=True)
+    payload_size_p90 = fields.Float(string="Payload Size p90 (bytes)", readonly=True)
+    graph_size_max = fields.Integer(string="Largest Attribute Graph", readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT MIN(id) AS id,
+                       route,
+                       COUNT(*) AS call_count,
+                       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY duration) AS duration_p50,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY duration) AS duration_p90,
+                       PERCENTILE_CONT(0.99) WITHIN GROUP (ORDER BY duration) AS duration_p99,
+                       PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY query_count) AS query_count_p50,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY query_count) AS query_count_p90,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY query_time) AS query_time_p90,
+                       PERCENTILE_CONT(0.9) WITHIN GROUP (ORDER BY payload_size) AS payload_size_p90,
+                       MAX(graph_size) AS graph_size_max
+                  FROM crm_configurator_metric
+              GROUP BY route
+            )
+        """)
+
+    @api.model
+    def get_performance_report(self, budgets=None):
+        """ Return the percentiles of each route, and the regression budgets they exceed.
+
+        The report is JSON-serializable, to be saved and compared across versions of the module,
+        e.g. after replaying the same scenario on each of them with the metrics enabled.
+
+        :param dict budgets: the maximum value of the report fields of each route, e.g.
+            ``{'/crm_product_configurator/get_values': {'duration_p90': 200, 'query_count_p90': 20}}``.
+            Read from the `crm_product_configurator.metric_budgets` system parameter, as JSON, by
+            default.
+        :return: the report fields of each `routes`, and the `exceeded` budgets, as dicts with the
+            `route`, `field`, `value` and `budget` keys.
+        :rtype: dict
+        """
+        if not self.env.user.has_group('base.group_system'):
+            raise AccessError(_("Only administrators can read the configurator performance report."))
+        if budgets is None:
+            budgets = json.loads(
+                self.env['ir.config_parameter'].sudo().get_param(METRIC_BUDGETS_PARAM) or '{}'
+            )
+        routes = {
+            values.pop('route'): {field: values[field] for field in REPORT_FIELDS}
+            for values in self.search_read([], ['route', *REPORT_FIELDS])
+        }
+        exceeded = [
+            {'route': route, 'field': field, 'value': routes[route][field], 'budget': budget}
+            for route, route_budgets in budgets.items() if route in routes
+            for field, budget in route_budgets.items()
+            if routes[route].get(field) is not None and routes[route][field] > budget
+        ]
+        for budget in exceeded:
+            _logger.warning(
+                "[CRM Configurator] %(route)s exceeds its %(field)s budget: %(value)s > %(budget)s",
+                budget,
+            )
+        return {'routes': routes, 'exceeded': exceeded}
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models, _
+from odoo import api, fields, models
 import json
-from odoo.exceptions import ValidationError
 
 
 class CrmLead(models.Model):
@@ -45,72 +44,13 @@ class CrmLead(models.Model):
         if self.grid and self.grid_update:
             grid = json.loads(self.grid)
             product_template = self.env['product.template'].browse(grid['product_template_id'])
-            product_ids = set()
-            dirty_cells = grid['changes']
-            Attrib = self.env['product.template.attribute.value']
-            new_lines = []
-
-            for cell in dirty_cells:
-                combination = Attrib.browse(cell['ptav_ids'])
-                no_variant_attribute_values = combination - combination._without_no_variant_attributes()
-
-                # Create or find product variant from combination
-                product = product_template._create_product_variant(combination)
-
-                existing_lines = self.material_line_ids.filtered(
-                    lambda line: line.product_id == product and line.product_no_variant_attribute_value_ids == no_variant_attribute_values
-                )
-
-                old_qty = sum(existing_lines.mapped('quantity'))
-                qty = cell['qty']
-                diff = qty - old_qty
-
-                if not diff:
-                    continue
-
-                product_ids.add(product.id)
-
-                if existing_lines:
-                    if qty == 0:
-                        self.material_line_ids -= existing_lines
-                    else:
-                        if len(existing_lines) > 1:
-                            raise ValidationError(_("You cannot change the quantity of a product present in multiple material lines."))
-                        else:
-                            existing_lines[0].quantity = qty
-                else:
-                    new_lines.append((0, 0, {
-                        'product_id': product.id,
-                        'product_template_id': product_template.id,
-                        'product_no_variant_attribute_value_ids': [(6, 0, no_variant_attribute_values.ids)],
-                        'quantity': qty,
-                    }))
-
-            if new_lines:
-                self.update({'material_line_ids': new_lines})
+            commands = self.material_line_ids._get_grid_commands(product_template, grid['changes'])
+            if commands:
+                self.update({'material_line_ids': commands})
 
     def _get_matrix(self, product_template):
-        def has_ptavs(line, sorted_attr_ids):
-            ptav = line.product_template_attribute_value_ids.ids
-            pnav = line.product_no_variant_attribute_value_ids.ids
-            pav = pnav + ptav
-            pav.sort()
-            return pav == sorted_attr_ids
-
-        matrix = product_template._get_template_matrix()
-
-        if self.material_line_ids:
-            lines = matrix['matrix']
-            material_lines = self.material_line_ids.filtered(lambda line: line.product_template_id == product_template)
-            for row in lines:
-                for cell in row:
-                    if not cell.get('name', False):
-                        matched_line = material_lines.filtered(lambda line: has_ptavs(line, cell['ptav_ids']))
-                        if matched_line:
-                            cell.update({'qty': sum(matched_line.mapped('quantity'))})
+        return self.material_line_ids._get_grid_matrix(product_template)
 
-        return matrix
-    
     @api.model
     def create_material_line_from_configurator(self, product_data, lead_id=None):
         """
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models
+from odoo import _, api, fields, models, Command
+from odoo.exceptions import ValidationError
+from odoo.tools import create_index, split_every
 import logging
+import time
+from collections import defaultdict
 
 _logger = logging.getLogger(__name__)
 
+# Number of lines imported per savepoint by `import_material_lines`.
+IMPORT_CHUNK_SIZE = 500
+
 
 class CrmMaterialLine(models.Model):
     _inherit = "crm.material.line"
@@ -26,6 +33,38 @@ class CrmMaterialLine(models.Model):
         copy=True
     )
 
+    combination_key = fields.Char(
+        compute='_compute_combination_key',
+        store=True,
+        help="Sorted ids of all the attribute values of the line, including the no_variant ones. "
+             "Used to find the line of a configured combination with an indexed lookup."
+    )
+
+    def init(self):
+        super().init()
+        create_index(
+            self.env.cr,
+            'crm_material_line_lead_combination_key_index',
+            self._table,
+            ['lead_id', 'product_template_id', 'combination_key'],
+        )
+
+    @api.depends('product_template_attribute_value_ids', 'product_no_variant_attribute_value_ids')
+    def _compute_combination_key(self):
+        for line in self:
+            line.combination_key = self._get_combination_key(
+                line.product_template_attribute_value_ids.ids
+                + line.product_no_variant_attribute_value_ids.ids
+            )
+
+    @api.model
+    def _get_combination_key(self, ptav_ids):
+        """
+        Return the normalized key of a combination of `product.template.attribute.value` ids,
+        False for an empty combination.
+        """
+        return ','.join(str(ptav_id) for ptav_id in sorted(set(map(int, ptav_ids)))) or False
+
     @api.depends('product_id')
     def _compute_custom_attribute_values(self):
         """
@@ -46,6 +85,376 @@ class CrmMaterialLine(models.Model):
                 if attribute.custom_product_template_attribute_value_id not in valid_values:
                     line.product_custom_attribute_value_ids -= attribute
 
+    @api.model
+    def _save_configurator_products(self, lead, products_data):
+        """
+        Create or update the material lines of the lead for the products confirmed in the
+        configurator. The variants, templates, values and existing lines of all the products are
+        read in bulk, then all the new lines are created at once, so that the number of queries
+        doesn't depend on the number of products.
+        """
+        for product_data in products_data:
+            if not product_data.get('product_id'):
+                _logger.warning(
+                    "[CRM Configurator] Skipping: No product_id for template_id=%s",
+                    product_data.get('product_template_id'),
+                )
+        products_data = [product_data for product_data in products_data if product_data.get('product_id')]
+        if not products_data:
+            return self.browse()
+
+        # Clean up any blank lines (no product selected)
+        self.search([('lead_id', '=', lead.id), ('product_id', '=', False)]).unlink()
+
+        variants = self.env['product.product'].browse(
+            {int(product_data['product_id']) for product_data in products_data}
+        )
+        existing_variants = variants.exists()
+        if missing_variants := variants - existing_variants:
+            raise ValueError(f"Product ID {missing_variants[0].id} not found")
+        # Prefetch everything needed to build the line values
+        existing_variants.read(['default_code', 'name', 'uom_id', 'description_sale', 'product_tmpl_id'])
+        existing_variants.product_tmpl_id.read(['categ_id', 'description_sale'])
+        existing_variants.product_template_attribute_value_ids.read(['name', 'attribute_id'])
+        default_uom = self.env.ref('uom.product_uom_unit', raise_if_not_found=False) or self.env['uom.uom']
+
+        existing_lines = defaultdict(lambda: self.browse())
+        for line in self.search([
+            ('lead_id', '=', lead.id),
+            ('product_template_id', 'in', existing_variants.product_tmpl_id.ids),
+            ('combination_key', 'in', list({
+                self._get_combination_key(product_data.get('ptav_ids', []))
+                for product_data in products_data
+            })),
+        ]):
+            existing_lines[line.product_template_id.id, line.combination_key] |= line
+
+        vals_to_create = {}
+        for product_data in products_data:
+            product_variant = variants.browse(int(product_data['product_id']))
+            template = product_variant.product_tmpl_id
+            template_id = int(product_data.get('product_template_id'))
+            ptav_ids = list(map(int, product_data.get('ptav_ids', [])))
+            if template.id != template_id:
+                _logger.warning("Template ID mismatch: expected %s, got %s", template_id, template.id)
+
+            line_vals = self._prepare_configurator_line_vals(
+                product_variant, ptav_ids, float(product_data.get('quantity', 1.0)), default_uom
+            )
+            key = (template.id, self._get_combination_key(ptav_ids))
+            if existing_lines[key]:
+                existing_line = existing_lines[key][0]
+                _logger.info(
+                    "[CRM Configurator] Updating line %s: %s",
+                    existing_line.id, line_vals.get('product_display_name'),
+                )
+                existing_line.write(line_vals)
+            else:
+                _logger.info(
+                    "[CRM Configurator] Creating new line: %s", line_vals.get('product_display_name')
+                )
+                # The same combination configured twice is saved on a single line
+                vals_to_create[key] = dict(line_vals, lead_id=lead.id)
+
+        new_lines = self.create(list(vals_to_create.values()))
+        _logger.info("[CRM Configurator] Created line IDs: %s", new_lines.ids)
+        return new_lines
+
+    @api.model
+    def _prepare_configurator_line_vals(self, product_variant, ptav_ids, quantity, default_uom):
+        """
+        Return the values of the material line of a variant configured in the configurator.
+        """
+        template = product_variant.product_tmpl_id
+        uom_id = product_variant.uom_id.id or default_uom.id
+        if not product_variant.uom_id:
+            _logger.warning("Product %s has no UOM, using default", product_variant.id)
+        attribute_values = product_variant.product_template_attribute_value_ids
+
+        # Build display name
+        if product_variant.default_code:
+            base_name = f"[{product_variant.default_code}] {product_variant.name}"
+        else:
+            base_name = product_variant.name
+        attributes_summary = ", ".join(attr.name for attr in attribute_values)
+        product_display_name = f"{base_name} ({attributes_summary})" if attributes_summary else base_name
+
+        # Build attribute summary
+        attribute_summary = ", ".join(
+            f"{attr.attribute_id.name}: {attr.name}" for attr in attribute_values
+        )
+
+        # Build description
+        attribute_description = "\n".join(
+            f"• {attr.attribute_id.name}: {attr.name}" for attr in attribute_values
+        )
+        base_description = product_variant.description_sale or template.description_sale or ""
+        if attribute_description:
+            if base_description:
+                full_description = f"{base_description}\n\n📋 Selected Attributes:\n{attribute_description}"
+            else:
+                full_description = f"📋 Selected Attributes:\n{attribute_description}"
+        else:
+            full_description = base_description
+
+        # Prepare line values - ONLY safe fields
+        line_vals = {
+            'product_id': product_variant.id,
+            'quantity': quantity if quantity > 0 else 1.0,
+            'product_template_id': template.id,  # Always set from product's template
+            'product_template_attribute_value_ids': [(6, 0, ptav_ids)],
+        }
+        # Add optional fields only if they have values
+        if uom_id:
+            line_vals['product_uom_id'] = uom_id
+        if template.categ_id:
+            line_vals['product_category_id'] = template.categ_id.id
+        if product_display_name:
+            line_vals['product_display_name'] = product_display_name
+        if attribute_summary:
+            line_vals['attribute_summary'] = attribute_summary
+        if full_description:
+            line_vals['description'] = full_description
+        return line_vals
+
+    def _get_grid_matrix(self, product_template):
+        """
+        Return the variant grid of the template (see `product.template._get_template_matrix`),
+        filled with the quantities of the lines of a lead, `self`. The quantities are summed per
+        combination once, so that each cell is filled with a dictionary lookup instead of a scan
+        of all the lines.
+        """
+        matrix = product_template._get_template_matrix()
+        quantities = defaultdict(float)
+        for line in self.filtered(lambda line: line.product_template_id == product_template):
+            quantities[line.combination_key] += line.quantity
+        if quantities:
+            for row in matrix['matrix']:
+                for cell in row:
+                    if not cell.get('name', False):
+                        combination_key = self._get_combination_key(cell['ptav_ids'])
+                        if combination_key in quantities:
+                            cell.update({'qty': quantities[combination_key]})
+        return matrix
+
+    def _get_grid_commands(self, product_template, changes):
+        """
+        Return the commands applying the changes of the variant grid of the template to the lines
+        of a lead, `self`. The lines are indexed once on their variant and no_variant values, and
+        the variants of all the changed cells are found, and created if needed, at once.
+
+        :param product_template: the `product.template` of the grid.
+        :param list changes: the changed cells, as dicts with their `ptav_ids` and `qty`.
+        :return: the `material_line_ids` commands of the lead.
+        :rtype: list
+        """
+        Attrib = self.env['product.template.attribute.value']
+        ptav_ids = list({ptav_id for cell in changes for ptav_id in cell['ptav_ids']})
+        combinations = [
+            Attrib.browse(cell['ptav_ids']).with_prefetch(ptav_ids) for cell in changes
+        ]
+
+        # Index the lines once on their variant and no_variant values
+        lines_index = defaultdict(lambda: self.browse())
+        for line in self:
+            lines_index[line.product_id.id, frozenset(line.product_no_variant_attribute_value_ids.ids)] |= line
+
+        # Find the existing variants of all the changed cells at once
+        variants = product_template._get_variants_for_combinations(combinations)
+
+        line_changes = []
+        for cell, combination in zip(changes, combinations):
+            no_variant_attribute_values = combination - combination._without_no_variant_attributes()
+            product = variants.get(combination._without_no_variant_attributes()._ids2str())
+            existing_lines = (
+                lines_index[product.id, frozenset(no_variant_attribute_values.ids)]
+                if product else self.browse()
+            )
+            qty = cell['qty']
+            if qty - sum(existing_lines.mapped('quantity')):
+                line_changes.append((combination, no_variant_attribute_values, existing_lines, qty))
+
+        # Create or reactivate the variants of all the new lines at once
+        variants = product_template._create_product_variants([
+            combination for combination, _no_variant, existing_lines, _qty in line_changes
+            if not existing_lines
+        ])
+
+        commands = []
+        for combination, no_variant_attribute_values, existing_lines, qty in line_changes:
+            if existing_lines:
+                if qty == 0:
+                    commands += [Command.unlink(line.id) for line in existing_lines]
+                elif len(existing_lines) > 1:
+                    raise ValidationError(_("You cannot change the quantity of a product present in multiple material lines."))
+                else:
+                    commands.append(Command.update(existing_lines.id, {'quantity': qty}))
+            else:
+                product = variants.get(
+                    combination._without_no_variant_attributes()._ids2str(),
+                    self.env['product.product'],
+                )
+                commands.append(Command.create({
+                    'product_id': product.id,
+                    'product_template_id': product_template.id,
+                    'product_no_variant_attribute_value_ids': [(6, 0, no_variant_attribute_values.ids)],
+                    'quantity': qty,
+                }))
+        return commands
+
+    @api.model
+    def import_material_lines(self, leads_data, chunk_size=IMPORT_CHUNK_SIZE):
+        """
+        Create or update the material lines of many leads at once, e.g. to sync them from an
+        external system.
+
+        A line is identified by its lead, template and normalized combination key: the lines of
+        the same combination are updated, the others created, and the same combination given
+        twice for a lead is saved on a single line. The lines are imported by chunks, each in its
+        own savepoint, with bulk reads, one search and one `create` per chunk. When a chunk
+        fails, its lines are imported one by one to only report the faulty ones as failed.
+
+        Leads are independent from each other: large imports can be split by lead across
+        several calls, workers or jobs, as long as a lead isn't imported by two of them at once.
+
+        :param list leads_data: dicts with the `crm_lead_id` of a lead and its `lines`, as dicts
+            with the `product_id`, `ptav_ids` and `quantity` keys, and optionally the
+            `product_uom_id` and `product_category_id` keys.
+        :param int chunk_size: the number of lines per chunk.
+        :return: the `results` of each line, in the order of `leads_data`, and the `stats` of
+            the import.
+        :rtype: dict
+        """
+        start = time.perf_counter()
+        entries = [
+            (int(lead_data.get('crm_lead_id') or 0), index, line_data)
+            for lead_data in leads_data
+            for index, line_data in enumerate(lead_data.get('lines', []))
+        ]
+        results = []
+        for chunk in split_every(chunk_size, entries, list):
+            results += self._import_material_lines_chunk(chunk)
+
+        duration = time.perf_counter() - start
+        stats = {
+            'lines': len(results),
+            'created': len({result['line_id'] for result in results if result.get('created')}),
+            'updated': len({result['line_id'] for result in results if result.get('updated')}),
+            'failed': sum(1 for result in results if not result['success']),
+            'duration': duration,
+            'lines_per_second': len(results) / duration if duration else 0.0,
+        }
+        _logger.info(
+            "[CRM Configurator] Imported %(lines)s material lines in %(duration).2fs: %(created)s "
+            "created, %(updated)s updated, %(failed)s failed (%(lines_per_second).0f lines/s)",
+            stats,
+        )
+        return {'results': results, 'stats': stats}
+
+    @api.model
+    def _import_material_lines_chunk(self, entries):
+        """
+        Import a chunk of lines of `import_material_lines` in a savepoint, falling back to
+        importing its lines one by one if it fails.
+
+        :param list entries: the lines, as (lead id, index of the line in the lead, line data)
+            tuples.
+        :return: the result of each line.
+        :rtype: list
+        """
+        try:
+            with self.env.cr.savepoint():
+                return self._upsert_material_lines(entries)
+        except Exception as e:
+            if len(entries) == 1:
+                lead_id, index, __ = entries[0]
+                _logger.warning(
+                    "[CRM Configurator] Failed to import line %s of lead %s: %s", index, lead_id, e
+                )
+                return [{'success': False, 'lead_id': lead_id, 'index': index, 'error': str(e)}]
+        return [
+            result
+            for entry in entries
+            for result in self._import_material_lines_chunk([entry])
+        ]
+
+    @api.model
+    def _upsert_material_lines(self, entries):
+        """
+        Create or update the given lines of `import_material_lines`, with a fixed number of
+        queries. The lines whose lead or product doesn't exist are reported as failed.
+
+        :param list entries: see `_import_material_lines_chunk`.
+        :return: the result of each line.
+        :rtype: list
+        """
+        leads = self.env['crm.lead'].browse({lead_id for lead_id, __, __ in entries if lead_id})
+        lead_ids = set(leads.exists().ids)
+        variants = self.env['product.product'].browse({
+            int(line_data.get('product_id') or 0)
+            for __, __, line_data in entries
+            if line_data.get('product_id')
+        }).exists()
+        # Prefetch everything needed to build the line values
+        variants.read(['default_code', 'name', 'uom_id', 'description_sale', 'product_tmpl_id'])
+        variants.product_tmpl_id.read(['categ_id', 'description_sale'])
+        variants.product_template_attribute_value_ids.read(['name', 'attribute_id'])
+        default_uom = self.env.ref('uom.product_uom_unit', raise_if_not_found=False) or self.env['uom.uom']
+
+        results = []
+        vals_per_key = {}
+        for lead_id, index, line_data in entries:
+            result = {'lead_id': lead_id, 'index': index}
+            results.append(result)
+            product_id = int(line_data.get('product_id') or 0)
+            if lead_id not in lead_ids:
+                result.update(success=False, error=f"Lead ID {lead_id} not found")
+                continue
+            if product_id not in variants.ids:
+                result.update(success=False, error=f"Product ID {product_id} not found")
+                continue
+            product_variant = variants.browse(product_id)
+            ptav_ids = list(map(int, line_data.get('ptav_ids', [])))
+            line_vals = self._prepare_configurator_line_vals(
+                product_variant, ptav_ids, float(line_data.get('quantity', 1.0)), default_uom
+            )
+            if line_data.get('product_uom_id'):
+                line_vals['product_uom_id'] = int(line_data['product_uom_id'])
+            if line_data.get('product_category_id'):
+                line_vals['product_category_id'] = int(line_data['product_category_id'])
+            key = (lead_id, product_variant.product_tmpl_id.id, self._get_combination_key(ptav_ids))
+            result.update(key=key)
+            # The same combination given several times is saved once, with its last values
+            vals_per_key[key] = line_vals
+
+        existing_lines = {}
+        if vals_per_key:
+            for line in self.search([
+                ('lead_id', 'in', list({key[0] for key in vals_per_key})),
+                ('product_template_id', 'in', list({key[1] for key in vals_per_key})),
+                ('combination_key', 'in', list({key[2] for key in vals_per_key})),
+            ], order='id'):
+                existing_lines.setdefault(
+                    (line.lead_id.id, line.product_template_id.id, line.combination_key), line
+                )
+        vals_to_create = {}
+        for key, line_vals in vals_per_key.items():
+            if key in existing_lines:
+                existing_lines[key].write(line_vals)
+            else:
+                vals_to_create[key] = dict(line_vals, lead_id=key[0])
+        new_lines = dict(zip(vals_to_create, self.create(list(vals_to_create.values()))))
+
+        for result in results:
+            if 'key' not in result:
+                continue
+            key = result.pop('key')
+            if key in new_lines:
+                result.update(success=True, created=True, line_id=new_lines[key].id)
+            else:
+                result.update(success=True, updated=True, line_id=existing_lines[key].id)
+        return results
+
     @api.model
     def update_material_line_from_configurator(self, payload):
         """
@@ -73,7 +482,7 @@ class CrmMaterialLine(models.Model):
             if line_id:
                 line = self.env['crm.material.line'].sudo().browse(int(line_id))
                 if line.exists():
-                    _logger.info(f"✏️ Updating existing CRM Material Line ID: {line_id}")
+                    _logger.info("✏️ Updating existing CRM Material Line ID: %s", line_id)
                     line.write({
                         'product_id': product_id,
                         'product_template_id': template_id,
@@ -88,19 +497,19 @@ class CrmMaterialLine(models.Model):
             domain = [
                 ('lead_id', '=', lead_id),
                 ('product_template_id', '=', template_id),
+                ('combination_key', '=', self._get_combination_key(ptav_ids)),
             ]
-            candidate_lines = self.env['crm.material.line'].sudo().search(domain)
-            for line in candidate_lines:
-                if set(line.product_template_attribute_value_ids.ids) == set(ptav_ids):
-                    _logger.info(f"🔁 Found matching line without line_id: {line.id}, updating...")
-                    line.write({
-                        'product_id': product_id,
-                        'quantity': quantity,
-                        'product_template_attribute_value_ids': [(6, 0, ptav_ids)],
-                        'product_uom_id': uom_id,
-                        'product_category_id': category_id,
-                    })
-                    return {'success': True, 'updated': True, 'line_id': line.id}
+            line = self.env['crm.material.line'].sudo().search(domain, limit=1)
+            if line:
+                _logger.info("🔁 Found matching line without line_id: %s, updating...", line.id)
+                line.write({
+                    'product_id': product_id,
+                    'quantity': quantity,
+                    'product_template_attribute_value_ids': [(6, 0, ptav_ids)],
+                    'product_uom_id': uom_id,
+                    'product_category_id': category_id,
+                })
+                return {'success': True, 'updated': True, 'line_id': line.id}
 
             # STEP 3: Create new line
             _logger.info("➕ Creating new CRM Material Line")
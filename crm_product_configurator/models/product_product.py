@@ -0,0 +1,26 @@
+from odoo import api, models
+
+from .configurator_cache import payload_cache
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        products = super().create(vals_list)
+        # Only archived variants are part of the exclusion graph.
+        archived_products = products.filtered(lambda product: not product.active)
+        archived_products.product_tmpl_id._reset_configurator_exclusion_graph()
+        return products
+
+    def write(self, values):
+        res = super().write(values)
+        if 'active' in values or 'product_template_attribute_value_ids' in values:
+            payload_cache.invalidate(self.product_tmpl_id.ids)
+            self.product_tmpl_id._reset_configurator_exclusion_graph()
+        return res
+
+    def unlink(self):
+        self.product_tmpl_id._reset_configurator_exclusion_graph()
+        return super().unlink()
@@ -1,4 +1,28 @@
-from odoo import api, fields, models
+import itertools
+import json
+
+import psycopg2
+
+from odoo import _, api, fields, models
+from odoo.exceptions import AccessError
+from odoo.tools import json_default, split_every
+
+from .combination_solver import CombinationSolver
+from .configurator_cache import payload_cache
+
+PAYLOAD_CACHE_SIZE_PARAM = 'crm_product_configurator.payload_cache_size'
+PAYLOAD_CACHE_DEFAULT_SIZE = 128
+# Number of candidate combinations checked against the variants in the first query of
+# `_solve_first_possible_combination`, doubled for each following query.
+SOLVER_VARIANT_BATCH_SIZE = 100
+# Name of the snapshot attachments, by language.
+SNAPSHOT_ATTACHMENT_NAME = 'crm_product_configurator_snapshot_%s.json'
+# Number of templates whose snapshots are compiled at once by the scheduled action.
+SNAPSHOT_COMPILE_BATCH_SIZE = 100
+# Fields of the template whose changes outdate its snapshot, or make it need one.
+SNAPSHOT_TRIGGER_FIELDS = frozenset(['active', 'attribute_line_ids', 'crm_enabled'])
+# Key of the templates whose snapshots are to be compiled, in the precommit data of the cursor.
+SNAPSHOT_TRIGGER_PRECOMMIT_KEY = 'crm_product_configurator.snapshot_template_ids'
 
 
 class ProductTemplate(models.Model):
@@ -24,6 +48,11 @@ class ProductTemplate(models.Model):
         check_company=True)
     
     crm_enabled = fields.Boolean(string="CRM")
+    configurator_exclusion_graph = fields.Json(
+        string="Configurator Exclusion Graph", readonly=True, copy=False, prefetch=False,
+        help="Own exclusions and archived combinations of the template, as used by the product"
+             " configurator. Reset when the exclusions, attribute values or variants of the"
+             " template change, and rebuilt when next needed.")
 
     @api.depends('attribute_line_ids.value_ids.is_custom', 'attribute_line_ids.attribute_id.create_variant')
     def _compute_has_configurable_attributes(self):
@@ -38,6 +67,24 @@ class ProductTemplate(models.Model):
                 or any(attribute_value.is_custom for attribute_value in product.attribute_line_ids.value_ids)
             )
 
+    def write(self, vals):
+        res = super().write(vals)
+        payload_cache.invalidate(self.ids)
+        if 'attribute_line_ids' in vals:
+            self._reset_configurator_exclusion_graph()
+        if not SNAPSHOT_TRIGGER_FIELDS.isdisjoint(vals):
+            self._trigger_configurator_snapshots()
+        return res
+
+    def unlink(self):
+        payload_cache.invalidate(self.ids)
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'product.template'),
+            ('res_id', 'in', self.ids),
+            ('name', '=like', SNAPSHOT_ATTACHMENT_NAME % '%'),
+        ]).unlink()
+        return super().unlink()
+
     def get_single_product_variant(self):
         """ Method used by the product configurator to check if the product is configurable or not.
 
@@ -46,14 +93,639 @@ class ProductTemplate(models.Model):
         - has optional products """
         res = super().get_single_product_variant()
         if res.get('product_id', False):
-            has_optional_products = False
-            for optional_product in self.product_variant_id.optional_product_ids:
-                if optional_product.has_dynamic_attributes() or optional_product._get_possible_variants(
-                    self.product_variant_id.product_template_attribute_value_ids
-                ):
-                    has_optional_products = True
-                    break
             res.update({
-                'has_optional_products': has_optional_products,
+                'has_optional_products': self._has_possible_optional_products(
+                    self.product_variant_id.product_template_attribute_value_ids
+                ),
             })
         return res
+
+    def _has_possible_optional_products(self, parent_combination):
+        """ Return whether an optional product of the template can be added along with the given
+        combination, i.e. whether an optional product has dynamic attributes or an active variant
+        which isn't excluded by the combination.
+
+        Unlike checking `_get_possible_variants` of each optional product, this costs a constant
+        number of queries, whatever the number of optional products and variants: the variants of
+        a template already satisfy its own exclusions, so only the exclusions set by the parent
+        combination have to be checked, which is done by the search itself.
+
+        :param parent_combination: the `product.template.attribute.value` of the parent product.
+        :rtype: bool
+        """
+        self.ensure_one()
+        optional_templates = self.optional_product_ids
+        if not optional_templates:
+            return False
+        if any(template.has_dynamic_attributes() for template in optional_templates):
+            return True
+        domain = [('product_tmpl_id', 'in', optional_templates.ids)]
+        excluded_ptavs = self.env['product.template.attribute.exclusion'].search([
+            ('product_template_attribute_value_id', 'in', parent_combination.ids),
+            ('product_tmpl_id', 'in', optional_templates.ids),
+        ]).value_ids
+        if excluded_ptavs:
+            domain.append(('product_template_attribute_value_ids', 'not in', excluded_ptavs.ids))
+        return bool(self.env['product.product'].search(domain, limit=1))
+
+    def _solve_first_possible_combination(self, parent_combination=None):
+        """ Return the first possible combination of the template, as
+        `_get_first_possible_combination`, but found with a `CombinationSolver` rather than by
+        enumerating the combinations until a possible one is found.
+
+        The exclusions and parent exclusions are compiled into the constraints of the solver.
+        The variants are not: the solutions of the solver are checked in batches of growing size
+        against the variants of their combinations, found with an indexed lookup on
+        `combination_indices`, so that only the variants of the candidate combinations are read.
+        For templates without dynamic attributes, a combination needs an active variant,
+        otherwise it must not have an archived one. The solution is checked with
+        `_is_combination_possible`, the enumeration being used as a fallback should they
+        disagree.
+
+        :param parent_combination: the combination of the parent product, if any.
+        :return: the first possible combination, empty if there is none.
+        """
+        self.ensure_one()
+        ProductTemplateAttributeValue = self.env['product.template.attribute.value']
+        lines = self.valid_product_template_attribute_line_ids
+        if not self.active or not lines:
+            return self._get_first_possible_combination(parent_combination=parent_combination)
+
+        parent_excluded_ids = set()
+        if parent_combination:
+            for excluded_ids in self._get_parent_attribute_exclusions(parent_combination).values():
+                parent_excluded_ids.update(excluded_ids)
+        domains = [
+            [ptav_id for ptav_id in line.product_template_value_ids._only_active().ids
+             if ptav_id not in parent_excluded_ids]
+            for line in lines
+        ]
+        variant_lines = [
+            index for index, line in enumerate(lines)
+            if line.attribute_id.create_variant != 'no_variant'
+        ]
+        solutions = CombinationSolver(
+            domains,
+            exclusions={
+                int(ptav_id): excluded_ids
+                for ptav_id, excluded_ids
+                in self._get_configurator_exclusion_graph()[self.id]['exclusions'].items()
+            },
+        ).solutions()
+
+        solution = None
+        if not variant_lines:
+            solution = next(solutions, None)
+        # Whether the combinations of the variant lines are possible, by combination indices.
+        # A combination without variant is only possible with dynamic attributes.
+        dynamic = self.has_dynamic_attributes()
+        possible_per_indices = {}
+        batch_size = SOLVER_VARIANT_BATCH_SIZE
+        while solution is None and variant_lines:
+            batch = [
+                (candidate, ','.join(map(str, sorted(candidate[index] for index in variant_lines))))
+                for candidate in itertools.islice(solutions, batch_size)
+            ]
+            if not batch:
+                break
+            unknown_indices = {
+                indices for _candidate, indices in batch if indices not in possible_per_indices
+            }
+            for indices in unknown_indices:
+                possible_per_indices[indices] = dynamic
+            # Active variants come last so that they take precedence over archived ones.
+            variants = self.env['product.product'].with_context(active_test=False).search_fetch([
+                ('product_tmpl_id', '=', self.id),
+                ('combination_indices', 'in', list(unknown_indices)),
+            ], ['combination_indices', 'active'], order='active ASC')
+            for variant in variants:
+                possible_per_indices[variant.combination_indices] = variant.active
+            solution = next(
+                (candidate for candidate, indices in batch if possible_per_indices[indices]), None
+            )
+            # Bound the number of queries when the first candidates have no variant.
+            batch_size *= 2
+        if solution is None:
+            return ProductTemplateAttributeValue
+        combination = ProductTemplateAttributeValue.browse(solution)
+        if self._is_combination_possible(combination, parent_combination=parent_combination):
+            return combination
+        return self._get_first_possible_combination(parent_combination=parent_combination)
+
+    def _get_or_create_product_variant(self, combination):
+        """ Return the variant of the combination, creating it if needed.
+
+        The variant is looked up through the indexed `combination_indices` of the variants. When it
+        has to be created, the template is locked first, and the variant is looked up again
+        without the cache of `_get_variant_for_combination`: a concurrent request creating the same
+        variant fails to get the lock and is retried by the server, and then finds the variant.
+
+        A request whose snapshot predates the commit of the same variant by another transaction
+        still misses it, and its creation breaks the unique index on the combination. The error
+        is raised as a serialization failure, for the server to retry the request with a fresh
+        snapshot, which finds the variant.
+
+        :param combination: the `product.template.attribute.value` of the variant.
+        :return: the variant, or an empty recordset if the combination is not possible.
+        """
+        self.ensure_one()
+        variant = self._get_variant_for_combination(combination)
+        if variant.active and self._is_combination_possible(combination, ignore_no_variant=True):
+            return variant
+        self.env.cr.execute(
+            "SELECT 1 FROM product_template WHERE id = %s FOR NO KEY UPDATE NOWAIT", [self.id]
+        )
+        variant = self._get_variants_for_combinations([combination]).get(
+            combination._without_no_variant_attributes()._ids2str()
+        )
+        if variant and variant.active and self._is_combination_possible(
+            combination, ignore_no_variant=True
+        ):
+            return variant
+        try:
+            with self.env.cr.savepoint():
+                return self._create_product_variant(combination)
+        except psycopg2.errors.UniqueViolation as e:
+            raise psycopg2.errors.SerializationFailure(
+                f"The variant of the combination {combination.ids} of the product template "
+                f"{self.id} was created by a concurrent transaction"
+            ) from e
+
+    def _get_variants_for_combinations(self, combinations):
+        """ Return the variants of the template matching the given combinations, archived
+        variants included, with a single query.
+
+        :param list combinations: `product.template.attribute.value` recordsets.
+        :return: the variants, indexed by the `combination_indices` of their combination.
+        :rtype: dict
+        """
+        self.ensure_one()
+        combination_indices = {
+            combination._without_no_variant_attributes()._ids2str() for combination in combinations
+        }
+        if '' in combination_indices:
+            combination_indices.add(False)
+        variants = {}
+        # Active variants come last so that they take precedence over archived ones.
+        for variant in self.env['product.product'].with_context(active_test=False).search([
+            ('product_tmpl_id', '=', self.id),
+            ('combination_indices', 'in', list(combination_indices)),
+        ], order='active ASC, id DESC'):
+            variants[variant.combination_indices or ''] = variant
+        return variants
+
+    def _create_product_variants(self, combinations):
+        """ Batched version of `_create_product_variant`: return the variants of the given
+        combinations, reactivating the archived ones and creating the missing ones at once.
+
+        Like `_create_product_variant`, no variant is returned for a combination which needs to be
+        created or reactivated but is not possible.
+
+        :param list combinations: `product.template.attribute.value` recordsets.
+        :return: the variants, indexed by the `combination_indices` of their combination.
+        :rtype: dict
+        """
+        self.ensure_one()
+        variants = self._get_variants_for_combinations(combinations)
+        Product = self.env['product.product']
+        variants_to_activate = Product
+        vals_per_indices = {}
+        for combination in combinations:
+            attribute_values = combination._without_no_variant_attributes()
+            indices = attribute_values._ids2str()
+            variant = variants.get(indices)
+            if variant and variant.active or indices in vals_per_indices:
+                continue
+            if not self._is_combination_possible(combination, ignore_no_variant=True):
+                variants.pop(indices, None)
+            elif variant:
+                variants_to_activate |= variant
+            else:
+                vals_per_indices[indices] = {
+                    'product_tmpl_id': self.id,
+                    'product_template_attribute_value_ids': [(6, 0, attribute_values.ids)],
+                    'active': self.active,
+                }
+        variants_to_activate.write({'active': True})
+        if vals_per_indices:
+            new_variants = Product.sudo().create(list(vals_per_indices.values()))
+            variants.update(zip(vals_per_indices, new_variants.sudo(False)))
+        return variants
+
+    def _get_configurator_attribute_lines_data(self, lazy_images=True):
+        """ Return the attribute lines of the templates, as needed by the product configurator.
+
+        The lines, attributes and values of all the templates in `self` are fetched with a fixed
+        number of bulk reads, whatever the number of templates, lines and values.
+
+        :param bool lazy_images: whether the `image` of the values is a cache-busted
+            `/web/image` URL to load lazily, instead of the base64 content of the image.
+        :return: the attribute lines data of each template, indexed by template id. Each value
+            keeps its `ptav_active` flag so that archived values which are part of the current
+            combination can still be displayed.
+        :rtype: dict
+        """
+        ptals_data = self.attribute_line_ids.read(
+            ['product_tmpl_id', 'attribute_id', 'product_template_value_ids'], load=None
+        )
+        attributes = {
+            attribute['id']: attribute
+            for attribute in self.env['product.attribute'].browse(
+                {ptal['attribute_id'] for ptal in ptals_data}
+            ).read(['name', 'display_type', 'create_variant'])
+        }
+        ptavs = {
+            ptav['id']: ptav
+            for ptav in self.env['product.template.attribute.value'].browse(
+                {ptav_id for ptal in ptals_data for ptav_id in ptal['product_template_value_ids']}
+            ).read([
+                'name', 'html_color', 'is_custom', 'ptav_active', 'price_extra',
+                'product_attribute_value_id' if lazy_images else 'image',
+            ], load=None)
+        }
+        if lazy_images:
+            self._set_configurator_image_urls(ptavs.values())
+        attribute_lines_data = {template.id: [] for template in self}
+        for ptal in ptals_data:
+            attribute = attributes[ptal['attribute_id']]
+            attribute_lines_data[ptal['product_tmpl_id']].append(dict(
+                id=ptal['id'],
+                attribute=dict(
+                    id=attribute['id'],
+                    name=attribute['name'],
+                    display_type=attribute['display_type'],
+                ),
+                attribute_values=[ptavs[ptav_id] for ptav_id in ptal['product_template_value_ids']],
+                create_variant=attribute['create_variant'],
+            ))
+        return attribute_lines_data
+
+    def _get_configurator_price(
+            self, combination, product=None, quantity=1.0, uom=None, currency=None, pricelist=None,
+            date=None,
+    ):
+        """ Return the price of the given combination of the template in the configurator.
+
+        With a pricelist, this is the price of the pricelist for the given quantity, which takes
+        the extra prices of the values of the combination into account. Otherwise, this is the
+        cost of the product increased by these extra prices.
+
+        :param combination: the `product.template.attribute.value` of the combination.
+        :param product: the variant of the combination, if any.
+        :param float quantity: the quantity of the product.
+        :param uom: the `uom.uom` to express the price in, the one of the template by default.
+        :param currency: the `res.currency` to express the price in, the one of the template by
+            default.
+        :param pricelist: the `product.pricelist` to apply, if any.
+        :param date: the date of the price, today by default.
+        :rtype: float
+        """
+        self.ensure_one()
+        product_or_template = product or self
+        product_or_template = product_or_template.with_context(
+            **product_or_template._get_product_price_context(combination)
+        )
+        uom = uom or None
+        currency = currency or self.currency_id
+        date = date or fields.Date.context_today(self)
+        if pricelist:
+            return pricelist._get_product_price(
+                product_or_template, quantity, currency=currency, uom=uom, date=date
+            )
+        price = product_or_template._price_compute(
+            'standard_price', uom=uom, currency=currency, date=date
+        )[product_or_template.id]
+        price_extra = sum(combination.mapped('price_extra'))
+        return price + price_extra * self._get_configurator_price_extra_rate(uom, currency, date)
+
+    def _get_configurator_price_extra_rate(self, uom=None, currency=None, date=None):
+        """ Return the rate converting the extra prices of the values of the template, which are
+        expressed in its currency and for its UoM, to the given currency and UoM.
+
+        :rtype: float
+        """
+        self.ensure_one()
+        rate = 1.0
+        if uom and uom != self.uom_id:
+            rate = self.uom_id._compute_price(rate, uom)
+        if currency and currency != self.currency_id:
+            rate *= self.env['res.currency']._get_conversion_rate(
+                self.currency_id, currency, self.env.company, date or fields.Date.context_today(self)
+            )
+        return rate
+
+    @api.model
+    def _is_configurator_price_quantity_dependent(self, pricelist):
+        """ Return whether the configurator prices given by `_get_configurator_price` depend on
+        the quantity, i.e. whether the pricelist, or a pricelist it is based on, has rules with a
+        minimum quantity. Without pricelist, the prices never depend on the quantity.
+
+        :param pricelist: the `product.pricelist` of the configurator, if any.
+        :rtype: bool
+        """
+        checked_pricelists = self.env['product.pricelist']
+        while pricelist - checked_pricelists:
+            pricelist -= checked_pricelists
+            checked_pricelists |= pricelist
+            items = pricelist.item_ids
+            if any(item.min_quantity > 0 for item in items):
+                return True
+            pricelist = items.filtered(lambda item: item.base == 'pricelist').base_pricelist_id
+        return False
+
+    def _set_configurator_image_urls(self, ptavs_data):
+        """ Replace the attribute value id of each value by the URL of its image.
+
+        The image of a `product.template.attribute.value` is the one of its attribute value: the
+        checksums of these images are read in one query to build URLs which can be cached by the
+        browser until the image changes.
+
+        :param list ptavs_data: values read with their `product_attribute_value_id`, updated in
+            place with an `image` key, False when the value has no image.
+        """
+        checksums = {
+            attachment['res_id']: attachment['checksum']
+            for attachment in self.env['ir.attachment'].sudo().search_read([
+                ('res_model', '=', 'product.attribute.value'),
+                ('res_field', '=', 'image'),
+                ('res_id', 'in', [ptav['product_attribute_value_id'] for ptav in ptavs_data]),
+            ], ['res_id', 'checksum'])
+        }
+        for ptav in ptavs_data:
+            checksum = checksums.get(ptav.pop('product_attribute_value_id'))
+            ptav['image'] = (
+                f"/web/image/product.template.attribute.value/{ptav['id']}/image?unique={checksum}"
+                if checksum else False
+            )
+
+    def _get_configurator_static_data(self, currency_id=None, lazy_images=True):
+        """ Return the part of the configurator payload which doesn't depend on the selected
+        combination: attribute lines, own exclusions, archived combinations and optional products.
+
+        The data is served from a process-local LRU cache. Its size is set with the
+        `crm_product_configurator.payload_cache_size` system parameter, 0 disabling the cache.
+
+        :param int currency_id: the currency of the configurator, if any.
+        :param bool lazy_images: see `_get_configurator_attribute_lines_data`.
+        :return: the static data of each template, indexed by template id. The returned values
+            are shared with the cache and must not be modified.
+        :rtype: dict
+        """
+        cache_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            PAYLOAD_CACHE_SIZE_PARAM, PAYLOAD_CACHE_DEFAULT_SIZE
+        ))
+        if cache_size != payload_cache.max_size:
+            payload_cache.resize(cache_size)
+        versions = self._get_configurator_catalog_versions() if cache_size else {}
+        static_data, cache_keys = {}, {}
+        for template in self:
+            cache_key = (
+                template.id,
+                tuple(self.env.companies.ids),
+                self.env.lang,
+                currency_id or False,
+                lazy_images,
+                versions.get(template.id),
+            )
+            data = payload_cache.get(cache_key) if cache_size else None
+            if data is None:
+                cache_keys[template.id] = cache_key
+            else:
+                static_data[template.id] = data
+        missing_templates = self.browse(list(cache_keys))
+        if missing_templates:
+            attribute_lines_data = missing_templates._get_configurator_attribute_lines_data(
+                lazy_images=lazy_images
+            )
+            exclusion_graphs = missing_templates._get_configurator_exclusion_graph()
+            for template in missing_templates:
+                static_data[template.id] = data = dict(
+                    attribute_lines=attribute_lines_data[template.id],
+                    exclusions=exclusion_graphs[template.id]['exclusions'],
+                    archived_combinations=exclusion_graphs[template.id]['archived_combinations'],
+                    optional_product_tmpl_ids=template.optional_product_ids.ids,
+                )
+                if cache_size:
+                    payload_cache.set(cache_keys[template.id], data)
+        return static_data
+
+    def _get_configurator_exclusion_graph(self):
+        """ Return the own exclusions and archived combinations of the templates, as computed by
+        `_get_attribute_exclusions`, from their stored exclusion graph.
+
+        The graphs are read with a single query, so that every worker benefits from a graph as
+        soon as it is built. The graphs reset since the last read are rebuilt and stored back,
+        unless another transaction holds the template, in which case they are only returned.
+
+        :return: the exclusion graph of each template, indexed by template id: a dict with the
+            `exclusions` (indexed by the string ids of the values) and `archived_combinations`.
+        :rtype: dict
+        """
+        if not self:
+            return {}
+        self.env.cr.execute(
+            "SELECT id, configurator_exclusion_graph FROM product_template WHERE id IN %s",
+            [tuple(self.ids)],
+        )
+        graphs = dict(self.env.cr.fetchall())
+        for template in self:
+            if graphs.get(template.id) is not None:
+                continue
+            attribute_exclusions = template._get_attribute_exclusions()
+            graph = json.dumps(dict(
+                exclusions=attribute_exclusions['exclusions'],
+                archived_combinations=attribute_exclusions['archived_combinations'],
+            ))
+            graphs[template.id] = json.loads(graph)
+            try:
+                with self.env.cr.savepoint(flush=False):
+                    self.env.cr.execute("""
+                        UPDATE product_template
+                           SET configurator_exclusion_graph = %s
+                         WHERE id IN (SELECT id
+                                        FROM product_template
+                                       WHERE id = %s AND configurator_exclusion_graph IS NULL
+                                         FOR NO KEY UPDATE SKIP LOCKED)
+                    """, [graph, template.id])
+            except psycopg2.errors.SerializationFailure:
+                # The template was modified by a concurrent transaction, which reset its graph.
+                pass
+        self.invalidate_recordset(['configurator_exclusion_graph'])
+        return graphs
+
+    def _reset_configurator_exclusion_graph(self):
+        """ Reset the exclusion graph of the templates, to be rebuilt when next needed. """
+        if not self.ids:
+            return
+        self.env.cr.execute("""
+            UPDATE product_template
+               SET configurator_exclusion_graph = NULL
+             WHERE id IN %s AND configurator_exclusion_graph IS NOT NULL
+        """, [tuple(self.ids)])
+        self.invalidate_recordset(['configurator_exclusion_graph'])
+        # The snapshots are compiled from the exclusion graph.
+        self._trigger_configurator_snapshots()
+
+    def _get_configurator_snapshots(self):
+        """ Return the up-to-date configurator snapshots of the templates, in the language of the
+        context, see `_compile_configurator_snapshots`.
+
+        :return: the snapshot `ir.attachment` of each template having an up-to-date one, indexed
+            by template id.
+        :rtype: dict
+        """
+        if not self:
+            return {}
+        versions = self._get_configurator_catalog_versions()
+        snapshots = {}
+        for attachment in self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', 'product.template'),
+            ('res_id', 'in', self.ids),
+            ('name', '=', SNAPSHOT_ATTACHMENT_NAME % (self.env.lang or 'en_US')),
+        ], order='id'):
+            if attachment.description == json.dumps(versions.get(attachment.res_id), default=str):
+                snapshots[attachment.res_id] = attachment
+        return snapshots
+
+    def _compile_configurator_snapshots(self):
+        """ Compile the configurator snapshots of the templates, in the language of the context.
+
+        A snapshot is the static configurator data of a template (attribute lines, exclusions and
+        archived combinations) serialized to JSON, and stored in the filestore as an attachment
+        of the template. The attachment records the catalog version it was compiled from, see
+        `_get_configurator_catalog_versions`, and its checksum is the strong ETag of the snapshot.
+        Only the missing and outdated snapshots are compiled.
+
+        :return: the snapshot `ir.attachment` of each template, indexed by template id.
+        :rtype: dict
+        """
+        snapshots = self._get_configurator_snapshots()
+        outdated_templates = self.filtered(lambda template: template.id not in snapshots)
+        if not outdated_templates:
+            return snapshots
+        Attachment = self.env['ir.attachment'].sudo()
+        name = SNAPSHOT_ATTACHMENT_NAME % (self.env.lang or 'en_US')
+        Attachment.search([
+            ('res_model', '=', 'product.template'),
+            ('res_id', 'in', outdated_templates.ids),
+            ('name', '=', name),
+        ]).unlink()
+        versions = outdated_templates._get_configurator_catalog_versions()
+        static_data = outdated_templates._get_configurator_static_data()
+        new_snapshots = Attachment.create([{
+            'name': name,
+            'res_model': 'product.template',
+            'res_id': template.id,
+            'mimetype': 'application/json',
+            'description': json.dumps(versions.get(template.id), default=str),
+            'raw': json.dumps(dict(
+                attribute_lines=static_data[template.id]['attribute_lines'],
+                exclusions=static_data[template.id]['exclusions'],
+                archived_combinations=static_data[template.id]['archived_combinations'],
+            ), default=json_default).encode(),
+        } for template in outdated_templates])
+        snapshots.update(zip(outdated_templates.ids, new_snapshots))
+        return snapshots
+
+    def _trigger_configurator_snapshots(self):
+        """ Schedule the compilation of the snapshots, when some of the templates have one.
+
+        The templates are collected until the end of the transaction, and the scheduled action is
+        triggered at most once, right before the commit.
+        """
+        if not self.ids:
+            return
+        precommit_data = self.env.cr.precommit.data
+        template_ids = precommit_data.get(SNAPSHOT_TRIGGER_PRECOMMIT_KEY)
+        if template_ids is None:
+            template_ids = precommit_data[SNAPSHOT_TRIGGER_PRECOMMIT_KEY] = set()
+            env = self.env
+
+            @self.env.cr.precommit.add
+            def trigger_configurator_snapshots():
+                templates = env['product.template'].sudo().browse(
+                    precommit_data.pop(SNAPSHOT_TRIGGER_PRECOMMIT_KEY, ())
+                ).exists()
+                if any(template.crm_enabled for template in templates):
+                    cron = env.ref(
+                        'crm_product_configurator.ir_cron_compile_configurator_snapshots',
+                        raise_if_not_found=False,
+                    )
+                    if cron:
+                        cron._trigger()
+        template_ids.update(self.ids)
+
+    @api.model
+    def _cron_compile_configurator_snapshots(self):
+        """ Compile the outdated configurator snapshots of the CRM templates, in every installed
+        language.
+        """
+        templates = self.search([('crm_enabled', '=', True)])
+        for lang, _name in self.env['res.lang'].get_installed():
+            for template_ids in split_every(SNAPSHOT_COMPILE_BATCH_SIZE, templates.ids):
+                self.browse(template_ids).with_context(lang=lang)._compile_configurator_snapshots()
+
+    def _get_configurator_catalog_versions(self):
+        """ Return, for each template, a version of the catalog records its configurator payload
+        is built from. The version changes whenever one of these records is modified, created or
+        deleted, in any worker.
+
+        :return: the version of each template, indexed by template id.
+        :rtype: dict
+        """
+        if not self:
+            return {}
+        for model in (
+            'product.template',
+            'product.template.attribute.line',
+            'product.template.attribute.value',
+            'product.attribute.value',
+            'product.attribute',
+            'product.product',
+            'product.template.attribute.exclusion',
+        ):
+            self.env[model].flush_model()
+        self.env.cr.execute("""
+            SELECT tmpl.id,
+                   tmpl.write_date,
+                   ptal.write_date, ptal.count,
+                   ptav.write_date, ptav.count,
+                   variant.write_date, variant.count,
+                   exclusion.write_date, exclusion.count
+              FROM product_template tmpl,
+           LATERAL (SELECT MAX(write_date) AS write_date, COUNT(*) AS count
+                      FROM product_template_attribute_line
+                     WHERE product_tmpl_id = tmpl.id) ptal,
+           LATERAL (SELECT GREATEST(MAX(ptav.write_date), MAX(pav.write_date), MAX(pa.write_date))
+                           AS write_date,
+                           COUNT(*) AS count
+                      FROM product_template_attribute_value ptav
+                      JOIN product_attribute_value pav ON pav.id = ptav.product_attribute_value_id
+                      JOIN product_attribute pa ON pa.id = ptav.attribute_id
+                     WHERE ptav.product_tmpl_id = tmpl.id) ptav,
+           LATERAL (SELECT MAX(write_date) AS write_date, COUNT(*) AS count
+                      FROM product_product
+                     WHERE product_tmpl_id = tmpl.id) variant,
+           LATERAL (SELECT MAX(write_date) AS write_date, COUNT(*) AS count
+                      FROM product_template_attribute_exclusion
+                     WHERE product_tmpl_id = tmpl.id) exclusion
+             WHERE tmpl.id IN %s
+        """, [tuple(self.ids)])
+        return {template_id: tuple(version) for template_id, *version in self.env.cr.fetchall()}
+
+    def _get_configurator_graph_size(self):
+        """ Return the size of the attribute graph of the template: its number of attribute values
+        and of excluded values, as recorded by the configurator metrics.
+
+        :rtype: int
+        """
+        self.ensure_one()
+        ptavs = self.attribute_line_ids.product_template_value_ids
+        return len(ptavs) + sum(len(exclusion.value_ids) for exclusion in ptavs.exclude_for)
+
+    @api.model
+    def get_configurator_cache_stats(self):
+        """ Return the hit/miss counters of the configurator payload cache of this process. """
+        if not self.env.user.has_group('base.group_system'):
+            raise AccessError(_("Only administrators can read the configurator cache statistics."))
+        return payload_cache.get_stats()
@@ -0,0 +1,34 @@
+from odoo import api, models
+
+from .configurator_cache import payload_cache
+
+
+class ProductTemplateAttributeExclusion(models.Model):
+    _inherit = 'product.template.attribute.exclusion'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        exclusions = super().create(vals_list)
+        exclusions._reset_configurator_data()
+        return exclusions
+
+    def write(self, values):
+        templates = self._get_configurator_templates()
+        res = super().write(values)
+        templates |= self._get_configurator_templates()
+        payload_cache.invalidate(templates.ids)
+        templates._reset_configurator_exclusion_graph()
+        return res
+
+    def unlink(self):
+        self._reset_configurator_data()
+        return super().unlink()
+
+    def _get_configurator_templates(self):
+        """ Return the templates whose configurator exclusions depend on the exclusions. """
+        return self.product_tmpl_id | self.product_template_attribute_value_id.product_tmpl_id
+
+    def _reset_configurator_data(self):
+        templates = self._get_configurator_templates()
+        payload_cache.invalidate(templates.ids)
+        templates._reset_configurator_exclusion_graph()
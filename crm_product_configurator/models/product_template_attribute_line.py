@@ -0,0 +1,27 @@
+from odoo import api, models
+
+from .configurator_cache import payload_cache
+
+
+class ProductTemplateAttributeLine(models.Model):
+    _inherit = 'product.template.attribute.line'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        payload_cache.invalidate(lines.product_tmpl_id.ids)
+        lines.product_tmpl_id._reset_configurator_exclusion_graph()
+        return lines
+
+    def write(self, values):
+        templates = self.product_tmpl_id
+        res = super().write(values)
+        templates |= self.product_tmpl_id
+        payload_cache.invalidate(templates.ids)
+        templates._reset_configurator_exclusion_graph()
+        return res
+
+    def unlink(self):
+        payload_cache.invalidate(self.product_tmpl_id.ids)
+        self.product_tmpl_id._reset_configurator_exclusion_graph()
+        return super().unlink()
@@ -0,0 +1,18 @@
+from odoo import models
+
+from .configurator_cache import payload_cache
+
+
+class ProductTemplateAttributeValue(models.Model):
+    _inherit = 'product.template.attribute.value'
+
+    def write(self, values):
+        res = super().write(values)
+        payload_cache.invalidate(self.product_tmpl_id.ids)
+        self.product_tmpl_id._reset_configurator_exclusion_graph()
+        return res
+
+    def unlink(self):
+        payload_cache.invalidate(self.product_tmpl_id.ids)
+        self.product_tmpl_id._reset_configurator_exclusion_graph()
+        return super().unlink()
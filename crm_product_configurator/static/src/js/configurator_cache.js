@@ -0,0 +1,256 @@
+/** @odoo-module **/
+
+import { browser } from "@web/core/browser/browser";
+import { rpc } from "@web/core/network/rpc";
+import { user } from "@web/core/user";
+import { decodeConfiguratorValues } from "./configurator_codec";
+
+/**
+ * Bounded cache with least recently used eviction, and optional expiration of the entries.
+ */
+export class LRUCache {
+    /**
+     * @param {Object} [options]
+     * @param {Number} [options.maxSize] - the maximum number of entries.
+     * @param {Number} [options.maxAge] - the time after which an entry expires, in ms.
+     */
+    constructor({ maxSize = 200, maxAge = Infinity } = {}) {
+        this.maxSize = maxSize;
+        this.maxAge = maxAge;
+        this.context = undefined;
+        this.entries = new Map();
+    }
+
+    /**
+     * Return the value of the key, or undefined when it is missing or expired.
+     */
+    get(key) {
+        const entry = this.entries.get(key);
+        if (!entry) {
+            return undefined;
+        }
+        this.entries.delete(key);
+        if (Date.now() - entry.time > this.maxAge) {
+            return undefined;
+        }
+        // Re-insert the entry to mark it as the most recently used one.
+        this.entries.set(key, entry);
+        return entry.value;
+    }
+
+    set(key, value) {
+        this.entries.delete(key);
+        this.entries.set(key, { value, time: Date.now() });
+        while (this.entries.size > this.maxSize) {
+            this.entries.delete(this.entries.keys().next().value);
+        }
+    }
+
+    delete(key) {
+        this.entries.delete(key);
+    }
+
+    clear() {
+        this.entries.clear();
+    }
+
+    /**
+     * Set the context the values of the cache depend on, clearing the cache when it changes.
+     *
+     * @param {String} context
+     */
+    setContext(context) {
+        if (context !== this.context) {
+            this.clear();
+            this.context = context;
+        }
+    }
+}
+
+/**
+ * Information of the combinations returned by `update_combinations`, shared by all the
+ * configurator dialogs of the session.
+ */
+export const combinationCache = new LRUCache({ maxSize: 500, maxAge: 5 * 60 * 1000 });
+
+/**
+ * Configurator values prefetched for the configurable lines, shared by all the product fields.
+ */
+export const configuratorValuesCache = new LRUCache({ maxSize: 50, maxAge: 60 * 1000 });
+
+// Prefix of the keys of the configurator snapshots in the local storage.
+const SNAPSHOT_STORAGE_PREFIX = "crm_product_configurator.snapshot.";
+
+// Number of products whose configurator values are prefetched per `get_values_batch` request.
+const PREFETCH_BATCH_SIZE = 10;
+
+// Prefetches waiting for the browser to be idle, by key in `configuratorValuesCache`.
+const pendingPrefetches = new Map();
+let prefetchScheduled = false;
+
+/**
+ * Return the key of the configurator values of a product in `configuratorValuesCache`.
+ *
+ * @param {Object} params - the `get_values` parameters of the product: `product_template_id`,
+ *      `ptav_ids`, `quantity`, `product_uom_id`, `company_id`, `currency_id` and `pricelist_id`.
+ */
+export function getConfiguratorValuesKey(params) {
+    return JSON.stringify([
+        params.product_template_id,
+        params.ptav_ids.slice().sort((a, b) => a - b),
+        params.quantity,
+        params.product_uom_id,
+        params.company_id,
+        params.currency_id,
+        params.pricelist_id,
+    ]);
+}
+
+/**
+ * Return a copy of the prefetched configurator values of a product, if any.
+ *
+ * The values are copied since the configurator modifies them.
+ */
+export function getPrefetchedConfiguratorValues(params) {
+    const values = configuratorValuesCache.get(getConfiguratorValuesKey(params));
+    return values && structuredClone(values);
+}
+
+/**
+ * Prefetch the configurator values of a product when the browser is idle.
+ *
+ * The prefetches scheduled meanwhile are sent in `get_values_batch` requests of at most
+ * `PREFETCH_BATCH_SIZE` products per company, currency and pricelist. At most as many products
+ * as the cache holds are pending, the others would evict each other anyway. Prefetching is best
+ * effort: failures are ignored.
+ *
+ * @param {Object} params - see `getConfiguratorValuesKey`.
+ */
+export function prefetchConfiguratorValues(params) {
+    const key = getConfiguratorValuesKey(params);
+    if (
+        pendingPrefetches.has(key) ||
+        pendingPrefetches.size >= configuratorValuesCache.maxSize ||
+        configuratorValuesCache.get(key)
+    ) {
+        return;
+    }
+    pendingPrefetches.set(key, params);
+    if (!prefetchScheduled) {
+        prefetchScheduled = true;
+        if (window.requestIdleCallback) {
+            window.requestIdleCallback(sendPrefetches, { timeout: 2000 });
+        } else {
+            setTimeout(sendPrefetches, 200);
+        }
+    }
+}
+
+async function sendPrefetches() {
+    prefetchScheduled = false;
+    const prefetchesPerContext = new Map();
+    for (const [key, params] of pendingPrefetches) {
+        const contextKey = JSON.stringify([params.company_id, params.currency_id, params.pricelist_id]);
+        if (!prefetchesPerContext.has(contextKey)) {
+            prefetchesPerContext.set(contextKey, []);
+        }
+        prefetchesPerContext.get(contextKey).push([key, params]);
+    }
+    pendingPrefetches.clear();
+    const batches = [];
+    for (const prefetches of prefetchesPerContext.values()) {
+        for (let index = 0; index < prefetches.length; index += PREFETCH_BATCH_SIZE) {
+            batches.push(prefetches.slice(index, index + PREFETCH_BATCH_SIZE));
+        }
+    }
+    await Promise.all(batches.map(async (prefetches) => {
+        const { company_id, currency_id, pricelist_id } = prefetches[0][1];
+        let results;
+        try {
+            results = await rpc("/crm_product_configurator/get_values_batch", {
+                products: prefetches.map(([, params]) => ({
+                    product_template_id: params.product_template_id,
+                    quantity: params.quantity,
+                    product_uom_id: params.product_uom_id,
+                    ptav_ids: params.ptav_ids,
+                })),
+                company_id,
+                currency_id,
+                pricelist_id,
+                compact: true,
+            }, { silent: true });
+        } catch {
+            return;
+        }
+        prefetches.forEach(([key], index) => {
+            if (results[index]) {
+                configuratorValuesCache.set(key, decodeConfiguratorValues(results[index]));
+            }
+        });
+    }));
+}
+
+function getSnapshotStorageKey(productTemplateId) {
+    return `${SNAPSHOT_STORAGE_PREFIX}${user.lang}.${productTemplateId}`;
+}
+
+/**
+ * Return the configurator snapshot of a product template kept in the local storage, if any.
+ *
+ * @param {Number} productTemplateId
+ * @return {Object|null} the snapshot: its `etag` and its `data`, i.e. the attribute lines,
+ *      exclusions and archived combinations of the template.
+ */
+export function getStoredConfiguratorSnapshot(productTemplateId) {
+    try {
+        return JSON.parse(browser.localStorage.getItem(getSnapshotStorageKey(productTemplateId)));
+    } catch {
+        return null;
+    }
+}
+
+/**
+ * Load the configurator snapshot of a product template, revalidating the stored one with its
+ * ETag: the snapshot is only downloaded when the catalog of the template changed.
+ *
+ * @param {Number} productTemplateId
+ * @return {Promise<Object>} the snapshot, see `getStoredConfiguratorSnapshot`.
+ */
+export async function loadConfiguratorSnapshot(productTemplateId) {
+    const storedSnapshot = getStoredConfiguratorSnapshot(productTemplateId);
+    const response = await fetch(
+        `/crm_product_configurator/snapshot?product_template_id=${productTemplateId}`,
+        {
+            // Revalidate the stored snapshot rather than the one of the HTTP cache.
+            cache: "no-store",
+            headers: storedSnapshot ? { "If-None-Match": `"${storedSnapshot.etag}"` } : {},
+        }
+    );
+    if (response.status === 304 && storedSnapshot) {
+        return storedSnapshot;
+    }
+    if (!response.ok) {
+        throw new Error(`Failed to load the configurator snapshot: ${response.statusText}`);
+    }
+    const snapshot = {
+        etag: response.headers.get("ETag").replace(/^"|"$/g, ""),
+        data: await response.json(),
+    };
+    const key = getSnapshotStorageKey(productTemplateId);
+    try {
+        browser.localStorage.setItem(key, JSON.stringify(snapshot));
+    } catch {
+        // The storage is full: make room by dropping the other snapshots.
+        for (const storageKey of Object.keys(browser.localStorage)) {
+            if (storageKey.startsWith(SNAPSHOT_STORAGE_PREFIX)) {
+                browser.localStorage.removeItem(storageKey);
+            }
+        }
+        try {
+            browser.localStorage.setItem(key, JSON.stringify(snapshot));
+        } catch {
+            // The snapshot doesn't fit, it is only used for this dialog.
+        }
+    }
+    return snapshot;
+}
@@ -0,0 +1,66 @@
+/** @odoo-module **/
+
+// Format of the values encoded by `configurator_codec.py`.
+const COMPACT_FORMAT = "compact-1";
+
+/**
+ * Decode the configurator values returned in the compact format (see `configurator_codec.py`)
+ * into the objects expected by the configurator components. Values which are not encoded are
+ * returned as is.
+ *
+ * @param {Object} values - the result of `get_values`, requested with `compact`.
+ * @return {Object} the decoded values.
+ */
+export function decodeConfiguratorValues(values) {
+    if (values?.format !== COMPACT_FORMAT) {
+        return values;
+    }
+    const { strings, ...decodedValues } = values;
+    delete decodedValues.format;
+    const decodeString = (index) => (index < 0 ? false : strings[index]);
+    const decodeProduct = ({ ptav_ids: ptavIds, ...product }) => {
+        const decodeIds = (indexes) => indexes.map((index) => ptavIds[index]);
+        return {
+            ...product,
+            attribute_lines: product.attribute_lines.map(
+                ([
+                    id, attributeId, attributeName, displayType, createVariant, offset,
+                    names, htmlColors, images, isCustom, priceExtras, selectedIndexes,
+                ]) => ({
+                    id,
+                    attribute: {
+                        id: attributeId,
+                        name: decodeString(attributeName),
+                        display_type: decodeString(displayType),
+                    },
+                    attribute_values: names.map((name, index) => ({
+                        id: ptavIds[offset + index],
+                        name: decodeString(name),
+                        html_color: decodeString(htmlColors[index]),
+                        image: decodeString(images[index]),
+                        is_custom: Boolean(isCustom[index]),
+                        price_extra: priceExtras[index],
+                    })),
+                    selected_attribute_value_ids: decodeIds(selectedIndexes),
+                    create_variant: decodeString(createVariant),
+                })
+            ),
+            exclusions: Object.fromEntries(
+                product.exclusions.map(([index, ...excludedIndexes]) => [
+                    ptavIds[index], decodeIds(excludedIndexes),
+                ])
+            ),
+            archived_combinations: product.archived_combinations.map(decodeIds),
+            parent_exclusions: Object.fromEntries(
+                product.parent_exclusions.map(([parentPtavId, ...excludedIndexes]) => [
+                    parentPtavId, decodeIds(excludedIndexes),
+                ])
+            ),
+        };
+    };
+    return {
+        ...decodedValues,
+        products: values.products.map(decodeProduct),
+        optional_products: values.optional_products.map(decodeProduct),
+    };
+}
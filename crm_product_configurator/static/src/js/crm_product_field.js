@@ -2,11 +2,20 @@
 
 import { Many2OneField } from "@web/views/fields/many2one/many2one_field";
 import { useService } from "@web/core/utils/hooks";
+import { rpc } from "@web/core/network/rpc";
 import { x2ManyCommands } from "@web/core/orm_service";
 import { registry } from "@web/core/registry";
 import { _t } from "@web/core/l10n/translation";
-import { useEffect } from "@odoo/owl";
-import { crmProductConfiguratorDialog } from "./product_configurator_dialog/product_configurator_dialog";
+import { onMounted, useEffect } from "@odoo/owl";
+import {
+    getPrefetchedConfiguratorValues,
+    prefetchConfiguratorValues,
+} from "./configurator_cache";
+import { decodeConfiguratorValues } from "./configurator_codec";
+import {
+    crmProductConfiguratorDialog,
+    OPTIONAL_PRODUCTS_PAGE_SIZE,
+} from "./product_configurator_dialog/product_configurator_dialog";
 
 export class CrmProductMany2One extends Many2OneField {
     static template = "CrmMaterialLineProductField";
@@ -30,6 +39,16 @@ export class CrmProductMany2One extends Many2OneField {
                 this.currentValue = newVal;
             }
         });
+
+        // Warm up the configurator of the saved lines, so that editing their configuration
+        // doesn't wait for the server. The products which are not configured with the product
+        // configurator are skipped by `get_values_batch`.
+        onMounted(() => {
+            const record = this.props.record;
+            if (record?.resId && record.data.product_template_id) {
+                prefetchConfiguratorValues(this._getConfiguratorValuesParams(record, true));
+            }
+        });
     }
 
     get configurationButtonHelp() {
@@ -60,16 +79,29 @@ export class CrmProductMany2One extends Many2OneField {
         }
 
         try {
-            const variantInfo = await this.orm.call('product.template', 'get_single_product_variant', [templateId]);
-            const [configMode] = await this.orm.read('product.template', [templateId], ['product_config_mode']);
-
-            if (variantInfo?.product_id) {
+            // Single round trip: variant, configuration mode and configurator values at once.
+            const result = await rpc('/crm_product_configurator/resolve_product', {
+                product_template_id: templateId,
+                quantity: record.data.quantity || 1.0,
+                currency_id: record.data.currency_id?.[0],
+                product_uom_id: record.data.product_uom?.[0],
+                company_id: record.data.company_id?.[0],
+                ptav_ids: this._getPTAVIds(record, false),
+                optional_products_summary: true,
+                optional_products_limit: OPTIONAL_PRODUCTS_PAGE_SIZE,
+                pricelist_id: record.model.root.data.pricelist_id?.[0],
+                compact: true,
+            });
+
+            if (result.product_id) {
                 await record.update({
-                    product_id: [variantInfo.product_id.id, variantInfo.product_id.display_name],
+                    product_id: [result.product_id, result.product_name],
                 });
             } else {
-                if (!configMode?.product_config_mode || configMode.product_config_mode === 'configurator') {
-                    this._openConfigurator(false);
+                if (result.product_config_mode === 'configurator') {
+                    this._openConfigurator(
+                        false, decodeConfiguratorValues(result.configurator_values)
+                    );
                 } else {
                     this._openGridConfigurator(false);
                 }
@@ -78,20 +110,52 @@ export class CrmProductMany2One extends Many2OneField {
         }
     }
 
-    async _openConfigurator(edit = false) {
+    /**
+     * Return the ids of the PTAVs of the line, including the no_variant ones when editing.
+     */
+    _getPTAVIds(record, edit) {
+        const ptavRecords = record.data.product_template_attribute_value_ids?.records || [];
+        let ptavIds = ptavRecords.map(r => r.resId);
+        if (edit) {
+            const noVariantRecords = record.data.product_no_variant_attribute_value_ids?.records || [];
+            ptavIds = ptavIds.concat(noVariantRecords.map(r => r.resId));
+        }
+        return ptavIds;
+    }
+
+    /**
+     * Return the `get_values` parameters of the configurator of the line, see
+     * `getConfiguratorValuesKey`.
+     */
+    _getConfiguratorValuesParams(record, edit) {
+        return {
+            product_template_id: record.data.product_template_id[0],
+            ptav_ids: this._getPTAVIds(record, edit),
+            quantity: record.data.quantity || 1.0,
+            product_uom_id: record.data.product_uom?.[0],
+            company_id: record.data.company_id?.[0],
+            currency_id: record.data.currency_id?.[0],
+            pricelist_id: record.model.root.data.pricelist_id?.[0],
+        };
+    }
+
+    /**
+     * Open the configurator dialog.
+     *
+     * @param {Boolean} edit
+     * @param {Object} [values] - the `get_values` result when it was already loaded.
+     */
+    async _openConfigurator(edit = false, values = undefined) {
         
         const record = this.props.record;
         const templateId = record?.data?.product_template_id?.[0];
         if (!templateId) return;
 
-        const ptavRecords = record.data.product_template_attribute_value_ids?.records || [];
-        let ptavIds = ptavRecords.map(r => r.resId);
+        const ptavIds = this._getPTAVIds(record, edit);
         let customAttributes = [];
 
         if (edit) {
-            const noVariantRecords = record.data.product_no_variant_attribute_value_ids?.records || [];
-            ptavIds = ptavIds.concat(noVariantRecords.map(r => r.resId));
-
+            values ??= getPrefetchedConfiguratorValues(this._getConfiguratorValuesParams(record, true));
             customAttributes = (record.data.product_custom_attribute_value_ids?.records || []).map(r => ({
                 ptavId: r.data.custom_product_template_attribute_value_id?.[0],
                 value: r.data.custom_value,
@@ -106,8 +170,10 @@ export class CrmProductMany2One extends Many2OneField {
             productUOMId: record.data.product_uom?.[0],
             companyId: record.data.company_id?.[0],
             currencyId: record.data.currency_id?.[0],
+            pricelistId: record.model.root.data.pricelist_id?.[0],
             crmLeadId: record?.data?.lead_id?.[0] || false,
             edit,
+            values,
             save: async (mainProduct, optionalProducts) => {
                 await this.applyProduct(record, mainProduct);
                 for (const opt of optionalProducts || []) {
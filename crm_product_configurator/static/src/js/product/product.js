@@ -23,6 +23,7 @@ export class Product extends Component {
         exclusions: Object,
         parent_exclusions: Object,
         parent_product_tmpl_ids: { type: Array, element: Number, optional: true },
+        is_summary: { type: Boolean, optional: true }, // attribute lines not loaded yet
     };
 
     //--------------------------------------------------------------------------
@@ -1,10 +1,23 @@
 /** @odoo-module **/
 
 import { _t } from "@web/core/l10n/translation";
-import { Component, onWillStart, useState, useSubEnv,useEffect } from "@odoo/owl";
+import { Component, onWillStart, toRaw, useState, useSubEnv,useEffect } from "@odoo/owl";
 import { Dialog } from '@web/core/dialog/dialog';
 import { CrmProductList } from "../product_list/product_list";
-import { rpc } from "@web/core/network/rpc";
+import { ConnectionAbortedError, rpc } from "@web/core/network/rpc";
+import { pick } from "@web/core/utils/objects";
+import { useService } from "@web/core/utils/hooks";
+import { useDebounced } from "@web/core/utils/timing";
+import {
+    combinationCache,
+    getStoredConfiguratorSnapshot,
+    loadConfiguratorSnapshot,
+} from "../configurator_cache";
+
+// Delay during which the successive changes of the combinations are coalesced into one request.
+const COMBINATION_UPDATE_DELAY = 150;
+// Number of optional products whose summary is loaded at once.
+export const OPTIONAL_PRODUCTS_PAGE_SIZE = 20;
 export class crmProductConfiguratorDialog extends Component {
     static components = { Dialog, CrmProductList};
     static template = 'crm_product_configurator.dialog';
@@ -23,9 +36,11 @@ export class crmProductConfiguratorDialog extends Component {
         productUOMId: { type: Number, optional: true },
         companyId: { type: Number, optional: true },
         currencyId: { type: Number, optional: true },
+        pricelistId: { type: Number, optional: true },
         crmLeadId: Number,
         
         edit: { type: Boolean, optional: true },
+        values: { type: Object, optional: true }, // `get_values` result, when already loaded
         save: Function,
         discard: Function,
         close: Function, // This is the close from the env of the Dialog Component
@@ -38,11 +53,35 @@ export class crmProductConfiguratorDialog extends Component {
         this.optionalProductsTitle = _t("Add optional products");      
         this.title = _t("Configure your product");
         this.rpc = rpc;
+        this.notification = useService("notification");
         this.state = useState({
             products: [],
             optionalProducts: [],
-
+            // Number of optional products of the main product, and how many of them are loaded.
+            optionalProductsCount: 0,
+            loadedOptionalProductsCount: 0,
         });
+        // Resolved once all the data of the configurator is loaded.
+        this.dataLoaded = Promise.resolve();
+        // Whether the data failed to load after the first chunk, the dialog being closed then.
+        this.dataLoadingFailed = false;
+        // Whether the prices change with the quantity, i.e. need to be updated when it changes.
+        this.priceDependsOnQuantity = true;
+        this.exclusionIndexes = new WeakMap();
+        // Combination updates waiting to be sent, by product template id.
+        this.combinationUpdates = new Map();
+        // Request in flight for the combination updates, if any.
+        this.combinationRequest = null;
+        // Requests loading the complete information of summarized optional products, by template id.
+        this.optionalProductLoads = new Map();
+        this._flushCombinationUpdates = useDebounced(
+            () => this._sendCombinationUpdates(), COMBINATION_UPDATE_DELAY
+        );
+        // The cached combinations are only valid for the company, currency and pricelist they were
+        // computed for: drop them when the dialog is opened for other ones.
+        combinationCache.setContext(JSON.stringify(
+            [this.props.companyId, this.props.currencyId, this.props.pricelistId]
+        ));
         /**
          * Initializes sub-environment for product customization.
          */
@@ -63,41 +102,183 @@ export class crmProductConfiguratorDialog extends Component {
          * Loads data, sets state, updates custom values, and checks exclusions.
         */
         onWillStart(async () => {
-            const { products, optional_products } = await this._loadData(this.props.edit);
-
-            this.state.products = products;
-            this.state.optionalProducts = optional_products;
-
-            for (const customValue of this.props.customAttributeValues) {
-                this._updatePTAVCustomValue(
-                    this.env.mainProductTmplId,
-                    customValue.ptavId,
-                    customValue.value
-                );
-            }
-
-            if (this.state.products.length > 0) {
-                this._checkExclusions(this.state.products[0]);
+            if (this.props.values) {
+                const {
+                    products, optional_products, optional_products_count, price_depends_on_quantity
+                } = this.props.values;
+                this.priceDependsOnQuantity = price_depends_on_quantity ?? true;
+                this.state.products = products;
+                this.state.optionalProducts = optional_products;
+                this.state.optionalProductsCount = optional_products_count ?? optional_products.length;
+                this.state.loadedOptionalProductsCount = optional_products.length;
+                this._onDataLoaded();
             } else {
+                await this._loadData(this.props.edit);
             }
         });
 
     }
     /**
-         * Loads data for the product configurator.
-    */
+     * Loads data for the product configurator.
+     *
+     * The data is streamed: this only waits for the main product, its attribute lines,
+     * exclusions and optional products being rendered as they arrive. `dataLoaded` is resolved
+     * once they are all loaded. If the stream fails meanwhile, the user is notified and the
+     * dialog discarded, as the configuration can't be completed.
+     *
+     * The attribute lines and exclusions of the main product are taken from its snapshot kept
+     * in the local storage when it is up to date, which is revalidated meanwhile for the next
+     * openings of the configurator.
+     */
     async _loadData(onlyMainProduct) {
-        const params = {
+        const snapshot = getStoredConfiguratorSnapshot(this.props.productTemplateId);
+        loadConfiguratorSnapshot(this.props.productTemplateId).catch(() => {});
+        const chunks = this._streamData(onlyMainProduct, snapshot?.etag);
+        const { value: firstChunk } = await chunks.next();
+        this.priceDependsOnQuantity = firstChunk.price_depends_on_quantity;
+        this.state.products = [firstChunk.product];
+        this.dataLoaded = (async () => {
+            try {
+                await this._loadRemainingChunks(chunks, snapshot);
+            } catch (error) {
+                this.dataLoadingFailed = true;
+                this.notification.add(
+                    _t("The product configurator could not be loaded: %s", error.message),
+                    { type: "danger" }
+                );
+                this.onDiscard();
+                return;
+            }
+            this._onDataLoaded();
+        })();
+    }
+    /**
+     * Apply the chunks of the streamed values following the first one.
+     *
+     * @param {AsyncGenerator<Object>} chunks - the chunks, see `_streamData`.
+     * @param {Object|null} snapshot - the stored snapshot of the main product, if any.
+     */
+    async _loadRemainingChunks(chunks, snapshot) {
+        const product = this.state.products[0];
+        for await (const chunk of chunks) {
+            if (chunk.type === "snapshot") {
+                Object.assign(product, {
+                    attribute_lines: this._getSnapshotAttributeLines(snapshot.data, chunk),
+                    exclusions: snapshot.data.exclusions,
+                    archived_combinations: snapshot.data.archived_combinations,
+                });
+            } else if (chunk.type === "attribute_lines") {
+                // Replace the lines rather than extending them, for the exclusion index of
+                // the product to be rebuilt.
+                product.attribute_lines = [...product.attribute_lines, ...chunk.attribute_lines];
+            } else if (chunk.type === "exclusions") {
+                Object.assign(product, pick(
+                    chunk, "exclusions", "archived_combinations", "parent_exclusions"
+                ));
+            } else if (chunk.type === "optional_products") {
+                this.state.optionalProducts.push(...chunk.optional_products);
+                this.state.optionalProductsCount = chunk.optional_products_count;
+                this.state.loadedOptionalProductsCount += chunk.optional_products.length;
+            }
+        }
+    }
+    /**
+     * Stream the values of the product configurator from `get_values_stream`.
+     *
+     * @return {AsyncGenerator<Object>} the chunks of the values, as they arrive.
+     */
+    async *_streamData(onlyMainProduct, snapshotEtag) {
+        const params = new URLSearchParams({
             product_template_id: this.props.productTemplateId,
-            currency_id: this.props.currencyId,
             quantity: this.props.quantity,
+            ptav_ids: this.props.ptavIds.join(","),
+            only_main_product: onlyMainProduct,
+            optional_products_summary: true,
+            optional_products_limit: OPTIONAL_PRODUCTS_PAGE_SIZE,
+        });
+        for (const [name, value] of Object.entries({
+            currency_id: this.props.currencyId,
             product_uom_id: this.props.productUOMId,
             company_id: this.props.companyId,
-            ptav_ids: this.props.ptavIds,
-            only_main_product: onlyMainProduct,
-        };
-        const result = await this.rpc('/crm_product_configurator/get_values', params);
-        return result;
+            pricelist_id: this.props.pricelistId,
+            snapshot_etag: snapshotEtag,
+        })) {
+            if (value) {
+                params.set(name, value);
+            }
+        }
+        const response = await fetch(`/crm_product_configurator/get_values_stream?${params}`);
+        if (!response.ok) {
+            throw new Error(`Failed to load the product configurator: ${response.statusText}`);
+        }
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += value;
+            const lines = buffer.split("\n");
+            // The last line is incomplete until the next newline.
+            buffer = lines.pop();
+            for (const line of lines.filter(Boolean)) {
+                const chunk = JSON.parse(line);
+                if (chunk.type === "error") {
+                    throw new Error(chunk.message);
+                }
+                if (chunk.type === "done") {
+                    return;
+                }
+                yield chunk;
+            }
+        }
+        throw new Error(_t("The connection was closed before all the values were received."));
+    }
+    /**
+     * Return the attribute lines of a snapshot with the values selected in a `snapshot` chunk,
+     * as `_get_attribute_lines_information` does on the server.
+     *
+     * @param {Object} snapshotData - the data of the snapshot.
+     * @param {Object} chunk - the `snapshot` chunk of the streamed values.
+     */
+    _getSnapshotAttributeLines(snapshotData, chunk) {
+        return snapshotData.attribute_lines.map((ptal) => {
+            const selectedIds = chunk.selected_attribute_value_ids[ptal.id] || [];
+            return {
+                id: ptal.id,
+                attribute: ptal.attribute,
+                attribute_values: ptal.attribute_values
+                    .filter((ptav) => ptav.ptav_active || selectedIds.includes(ptav.id))
+                    .map((ptav) => ({
+                        ...pick(ptav, "id", "name", "html_color", "image", "is_custom"),
+                        price_extra: ptav.price_extra * chunk.price_extra_rate,
+                    })),
+                selected_attribute_value_ids: selectedIds,
+                create_variant: ptal.create_variant,
+            };
+        });
+    }
+    /**
+     * Finish the setup of the products once all their data is loaded.
+     */
+    _onDataLoaded() {
+        // The loaded combinations are known, toggling back to them doesn't need a request.
+        for (const product of [...this.state.products, ...this.state.optionalProducts]) {
+            this._cacheCombination(product);
+        }
+
+        for (const customValue of this.props.customAttributeValues) {
+            this._updatePTAVCustomValue(
+                this.env.mainProductTmplId,
+                customValue.ptavId,
+                customValue.value
+            );
+        }
+
+        if (this.state.products.length > 0) {
+            this._checkExclusions(this.state.products[0]);
+        }
     }
 
     /**
@@ -110,24 +291,170 @@ export class crmProductConfiguratorDialog extends Component {
         });
     }
     /**
-     * Updates a product combination with the provided quantity.
+     * Schedule the update of the combination information of the product.
+     *
+     * The changes made in a short time are coalesced into one trailing update per product, and
+     * the updates of all the products are sent in one `update_combinations` request.
+     *
+     * @param {Object} product
+     * @param {Object} [options]
+     * @param {Boolean} [options.checkArchived] - whether the selected PTAVs changed, in which
+     *      case a combination without variant is considered as archived.
      */
-    async _updateCombination(product, quantity) {
-        return this.rpc('/crm_product_configurator/update_combination', {
-            product_template_id: product.product_tmpl_id,
-            combination: this._getCombination(product),
+    _scheduleCombinationUpdate(product, { checkArchived = false } = {}) {
+        const cachedValues = combinationCache.get(this._getCombinationCacheKey(product));
+        if (cachedValues) {
+            // Serve the combination from the cache, discarding the updates of the product which
+            // are pending or in flight.
+            const productTmplId = product.product_tmpl_id;
+            const update = {
+                checkArchived: checkArchived ||
+                    this.combinationUpdates.get(productTmplId)?.checkArchived ||
+                    this.combinationRequest?.updates.get(productTmplId)?.checkArchived ||
+                    false,
+            };
+            this.combinationUpdates.delete(productTmplId);
+            this.combinationRequest?.updates.delete(productTmplId);
+            this._applyCombinationUpdate(product, cachedValues, update);
+            return;
+        }
+        const update = this.combinationUpdates.get(product.product_tmpl_id) || { checkArchived };
+        update.checkArchived ||= checkArchived;
+        this.combinationUpdates.set(product.product_tmpl_id, update);
+        this._flushCombinationUpdates();
+    }
+    /**
+     * Send the pending combination updates in one request.
+     *
+     * The request in flight, if any, is superseded: it is aborted and its updates are sent again
+     * along with the pending ones, so that stale results are never applied.
+     *
+     * @return {Promise} resolved once the results are applied.
+     */
+    _sendCombinationUpdates() {
+        const updates = this.combinationUpdates;
+        this.combinationUpdates = new Map();
+        if (this.combinationRequest) {
+            for (const [productTmplId, update] of this.combinationRequest.updates) {
+                if (updates.has(productTmplId)) {
+                    updates.get(productTmplId).checkArchived ||= update.checkArchived;
+                } else {
+                    updates.set(productTmplId, update);
+                }
+            }
+            this.combinationRequest.rpcPromise.abort();
+        }
+        const products = [...updates.keys()].map(id => this._findProduct(id)).filter(Boolean);
+        if (!products.length) {
+            this.combinationRequest = null;
+            return Promise.resolve();
+        }
+        const cacheKeys = products.map(product => this._getCombinationCacheKey(product));
+        const rpcPromise = this.rpc('/crm_product_configurator/update_combinations', {
+            products: products.map(product => ({
+                product_template_id: product.product_tmpl_id,
+                combination: this._getCombination(product),
+                quantity: product.quantity,
+            })),
             currency_id: this.props.currencyId,
             so_date: this.props.soDate,
-            quantity: quantity,
             product_uom_id: this.props.productUOMId,
             company_id: this.props.companyId,
             pricelist_id: this.props.pricelistId,
         });
+        const request = { updates, rpcPromise };
+        request.done = (async () => {
+            let results;
+            try {
+                results = await rpcPromise;
+            } catch (error) {
+                if (error instanceof ConnectionAbortedError) {
+                    return;
+                }
+                throw error;
+            } finally {
+                if (this.combinationRequest === request) {
+                    this.combinationRequest = null;
+                }
+            }
+            products.forEach((product, index) => {
+                combinationCache.set(cacheKeys[index], results[index]);
+                const update = updates.get(product.product_tmpl_id);
+                if (!update) {
+                    // The product was served from the cache meanwhile.
+                    return;
+                }
+                const pendingUpdate = this.combinationUpdates.get(product.product_tmpl_id);
+                if (pendingUpdate) {
+                    // The product changed meanwhile: its pending update will bring fresh values.
+                    pendingUpdate.checkArchived ||= update.checkArchived;
+                } else {
+                    this._applyCombinationUpdate(product, results[index], update);
+                }
+            });
+        })();
+        this.combinationRequest = request;
+        return request.done;
+    }
+    /**
+     * Return the key of the current combination of the product in the combination cache.
+     */
+    _getCombinationCacheKey(product) {
+        return JSON.stringify([
+            product.product_tmpl_id,
+            this._getCombination(product).slice().sort((a, b) => a - b),
+            product.quantity,
+            this.props.productUOMId,
+            this.props.currencyId,
+            this.props.companyId,
+            this.props.pricelistId,
+        ]);
+    }
+    /**
+     * Put the current combination of the product in the combination cache, unless the product is
+     * only summarized.
+     */
+    _cacheCombination(product) {
+        if (!product.is_summary) {
+            combinationCache.set(
+                this._getCombinationCacheKey(product),
+                pick(product, "id", "display_name", "description_sale", "price"),
+            );
+        }
+    }
+    /**
+     * Wait for all the scheduled combination updates to be applied.
+     */
+    async _waitCombinationUpdates() {
+        this._flushCombinationUpdates.cancel();
+        if (this.combinationUpdates.size) {
+            await this._sendCombinationUpdates();
+        } else if (this.combinationRequest) {
+            await this.combinationRequest.done;
+        }
     }
     /**
-     * Retrieves optional products available for the given product.
+     * Apply the updated information of a combination on the product.
      */
-    async _getOptionalProducts(product) {
+    _applyCombinationUpdate(product, updatedValues, { checkArchived }) {
+        Object.assign(product, updatedValues, { price: parseFloat(updatedValues.price) });
+        // When a combination should exist but was deleted from the database, it should not be
+        // selectable and considered as an exclusion.
+        if (checkArchived && !product.id && product.attribute_lines.every(ptal => ptal.create_variant === "always")) {
+            const combination = this._getCombination(product);
+            product.archived_combinations = product.archived_combinations.concat([combination]);
+            this._checkExclusions(product);
+        }
+    }
+    /**
+     * Retrieves the summary of the optional products available for the given product.
+     *
+     * @param {Object} product
+     * @param {Object} [options]
+     * @param {Number} [options.limit] - the maximum number of optional products to retrieve.
+     * @param {Number} [options.offset] - the number of optional products to skip.
+     */
+    async _getOptionalProducts(product, { limit, offset } = {}) {
         return this.rpc('/crm_product_configurator/get_optional_products', {
             product_template_id: product.product_tmpl_id,
             combination: this._getCombination(product),
@@ -136,34 +463,89 @@ export class crmProductConfiguratorDialog extends Component {
             so_date: this.props.soDate,
             company_id: this.props.companyId,
             pricelist_id: this.props.pricelistId,
+            summary: true,
+            limit,
+            offset,
         });
     }
+    /**
+     * Load the complete information of a summarized optional product.
+     *
+     * @return {Promise} resolved once the information is set on the product, shared by the
+     *      concurrent loads of the same product.
+     */
+    _loadOptionalProduct(product) {
+        const productTmplId = product.product_tmpl_id;
+        if (!this.optionalProductLoads.has(productTmplId)) {
+            const load = (async () => {
+                const values = await this.rpc('/crm_product_configurator/get_optional_product', {
+                    product_template_id: productTmplId,
+                    parent_combination: this._getParentsCombination(product),
+                    currency_id: this.props.currencyId,
+                    company_id: this.props.companyId,
+                    pricelist_id: this.props.pricelistId,
+                });
+                Object.assign(product, values, { is_summary: false });
+                this._cacheCombination(product);
+                this._checkExclusions(product);
+            })();
+            this.optionalProductLoads.set(productTmplId, load);
+            load.finally(() => this.optionalProductLoads.delete(productTmplId));
+        }
+        return this.optionalProductLoads.get(productTmplId);
+    }
+    /**
+     * Load the next page of optional products of the main product.
+     */
+    async loadMoreOptionalProducts() {
+        const mainProduct = this._findProduct(this.env.mainProductTmplId);
+        const optionalProducts = await this._getOptionalProducts(mainProduct, {
+            limit: OPTIONAL_PRODUCTS_PAGE_SIZE,
+            offset: this.state.loadedOptionalProductsCount,
+        });
+        this.state.loadedOptionalProductsCount += optionalProducts.length;
+        this._addOptionalProducts(optionalProducts, mainProduct.product_tmpl_id);
+    }
     /**
      * Add the product to the list of products and fetch his optional products.
      */
     async _addProduct(productTmplId) {
-        const index = this.state.optionalProducts.findIndex(
+        let index = this.state.optionalProducts.findIndex(
             p => p.product_tmpl_id === productTmplId
         );
+        if (index >= 0 && this.state.optionalProducts[index].is_summary) {
+            await this._loadOptionalProduct(this.state.optionalProducts[index]);
+            // The product may have been added meanwhile.
+            index = this.state.optionalProducts.findIndex(
+                p => p.product_tmpl_id === productTmplId
+            );
+        }
         if (index >= 0) {
             this.state.products.push(...this.state.optionalProducts.splice(index, 1));
             // Fetch optional product from the server with the parent combination.
             const product = this._findProduct(productTmplId);
-            let newOptionalProducts = await this._getOptionalProducts(product);
-            for(const newOptionalProductDict of newOptionalProducts) {
-                // If the optional product is already in the list, add the id of the parent product
-                // template in his list of `parent_product_tmpl_ids` instead of adding a second time
-                // the product.
-                const newProduct = this ._findProduct(newOptionalProductDict.product_tmpl_id);
-                if (newProduct) {
-                    newOptionalProducts = newOptionalProducts.filter(
-                        (p) => p.product_tmpl_id != newOptionalProductDict.product_tmpl_id
-                    );
-                    newProduct.parent_product_tmpl_ids.push(productTmplId);
+            this._addOptionalProducts(await this._getOptionalProducts(product), productTmplId);
+        }
+    }
+    /**
+     * Add the given products to the list of optional products of a parent product.
+     */
+    _addOptionalProducts(newOptionalProducts, parentProductTmplId) {
+        for(const newOptionalProductDict of newOptionalProducts) {
+            // If the optional product is already in the list, add the id of the parent product
+            // template in his list of `parent_product_tmpl_ids` instead of adding a second time
+            // the product.
+            const newProduct = this._findProduct(newOptionalProductDict.product_tmpl_id);
+            if (newProduct) {
+                newOptionalProducts = newOptionalProducts.filter(
+                    (p) => p.product_tmpl_id != newOptionalProductDict.product_tmpl_id
+                );
+                if (!newProduct.parent_product_tmpl_ids.includes(parentProductTmplId)) {
+                    newProduct.parent_product_tmpl_ids.push(parentProductTmplId);
                 }
             }
-            if (newOptionalProducts) this.state.optionalProducts.push(...newOptionalProducts);
         }
+        this.state.optionalProducts.push(...newOptionalProducts);
     }
     /**
      * Remove the product and his optional products from the list of products.
@@ -191,30 +573,36 @@ export class crmProductConfiguratorDialog extends Component {
     }
     /**
      * Set the quantity of the product to a given value.
+     *
+     * The combination information is only updated when the prices depend on the quantity.
      */
-    async _setQuantity(productTmplId, quantity) {
+    _setQuantity(productTmplId, quantity) {
         if (quantity <= 0) {
             if (productTmplId === this.env.mainProductTmplId) {
                 const product = this._findProduct(productTmplId);
-                const { price } = await this._updateCombination(product, 1);
                 product.quantity = 1;
-                product.price = parseFloat(price);
+                if (this.priceDependsOnQuantity) {
+                    this._scheduleCombinationUpdate(product);
+                }
                 return;
             };
             this._removeProduct(productTmplId);
         } else {
             const product = this._findProduct(productTmplId);
-            const { price } = await this._updateCombination(product, quantity);
             product.quantity = quantity;
-            product.price = parseFloat(price);
+            if (this.priceDependsOnQuantity) {
+                this._scheduleCombinationUpdate(product);
+            }
         }
     }
     /**
      * Change the value of `selected_attribute_value_ids` on the given PTAL in the product.
      */
-    async _updateProductTemplateSelectedPTAV(productTmplId, ptalId, ptavId, multiIdsAllowed) {
+    _updateProductTemplateSelectedPTAV(productTmplId, ptalId, ptavId, multiIdsAllowed) {
         const product = this._findProduct(productTmplId);
-        let selectedIds = product.attribute_lines.find(ptal => ptal.id === ptalId).selected_attribute_value_ids;
+        const ptal = product.attribute_lines.find(ptal => ptal.id === ptalId);
+        const previousPriceExtra = this._getPriceExtra(ptal);
+        let selectedIds = ptal.selected_attribute_value_ids;
         if (multiIdsAllowed) {
             const ptavID = parseInt(ptavId);
             if (!selectedIds.includes(ptavID)){
@@ -226,20 +614,23 @@ export class crmProductConfiguratorDialog extends Component {
         } else {
             selectedIds = [parseInt(ptavId)];
         }
-        product.attribute_lines.find(ptal => ptal.id === ptalId).selected_attribute_value_ids = selectedIds;
+        ptal.selected_attribute_value_ids = selectedIds;
+        // Show the price with the new extra prices right away, the combination update then brings
+        // the exact price, e.g. when a pricelist applies.
+        product.price += this._getPriceExtra(ptal) - previousPriceExtra;
         this._checkExclusions(product);
         if (this._isPossibleCombination(product)) {
-            const updatedValues = await this._updateCombination(product, product.quantity);
-            Object.assign(product, updatedValues);
-            // When a combination should exist but was deleted from the database, it should not be
-            // selectable and considered as an exclusion.
-            if (!product.id && product.attribute_lines.every(ptal => ptal.create_variant === "always")) {
-                const combination = this._getCombination(product);
-                product.archived_combinations = product.archived_combinations.concat([combination]);
-                this._checkExclusions(product);
-            }
+            this._scheduleCombinationUpdate(product, { checkArchived: true });
         }
     }
+    /**
+     * Return the sum of the extra prices of the selected PTAVs of the attribute line.
+     */
+    _getPriceExtra(ptal) {
+        return ptal.attribute_values
+            .filter(ptav => ptal.selected_attribute_value_ids.includes(ptav.id))
+            .reduce((priceExtra, ptav) => priceExtra + (ptav.price_extra || 0), 0);
+    }
     /**
      * Set the custom value for a given custom PTAV.
      */
@@ -254,46 +645,76 @@ export class crmProductConfiguratorDialog extends Component {
      */
     _checkExclusions(product, checked=undefined) {
         const combination = this._getCombination(product);
+        const combinationIds = new Set(combination);
         const exclusions = product.exclusions;
         const parentExclusions = product.parent_exclusions;
         const archivedCombinations = product.archived_combinations;
         const parentCombination = this._getParentsCombination(product);
         const childProducts = this._getChildProducts(product.product_tmpl_id)
-        const ptavList = product.attribute_lines.flat().flatMap(ptal => ptal.attribute_values)
-        ptavList.map(ptav => ptav.excluded = false); // Reset all the values
+        const { ptavById, ptalByPtavId, archivedCombinationsByPtav } = this._getExclusionIndex(
+            product
+        );
+        const excludedIds = new Set();
         if (exclusions) {
             for(const ptavId of combination) {
-                for(const excludedPtavId of exclusions[ptavId]) {
-                    ptavList.find(ptav => ptav.id === excludedPtavId).excluded = true;
+                for(const excludedPtavId of (exclusions[ptavId]||[])) {
+                    excludedIds.add(excludedPtavId);
                 }
             }
         }
         if (parentCombination) {
             for(const ptavId of parentCombination) {
                 for(const excludedPtavId of (parentExclusions[ptavId]||[])) {
-                    ptavList.find(ptav => ptav.id === excludedPtavId).excluded = true;
+                    excludedIds.add(excludedPtavId);
                 }
             }
         }
         if (archivedCombinations) {
-            for(const excludedCombination of archivedCombinations) {
-                const ptavCommon = excludedCombination.filter((ptav) => combination.includes(ptav));
-                if (ptavCommon.length === combination.length) {
-                    for(const excludedPtavId of ptavCommon) {
-                        ptavList.find(ptav => ptav.id === excludedPtavId).excluded = true;
+            // Count the PTAVs each archived combination shares with the combination, only going
+            // through the archived combinations which contain at least one of its PTAVs.
+            const commonCounts = new Map();
+            for(const ptavId of combinationIds) {
+                for(const index of (archivedCombinationsByPtav.get(ptavId)||[])) {
+                    commonCounts.set(index, (commonCounts.get(index) || 0) + 1);
+                }
+            }
+            if (combination.length === 1) {
+                // An archived combination sharing no PTAV is one PTAV away from the combination.
+                archivedCombinations.forEach((_, index) => commonCounts.set(index, commonCounts.get(index) || 0));
+            }
+            for(const [index, commonCount] of commonCounts) {
+                const excludedCombination = archivedCombinations[index];
+                if (commonCount === combination.length) {
+                    for(const excludedPtavId of excludedCombination) {
+                        if (combinationIds.has(excludedPtavId)) {
+                            excludedIds.add(excludedPtavId);
+                        }
                     }
-                } else if (ptavCommon.length === (combination.length - 1)) {
+                } else if (commonCount === (combination.length - 1)) {
                     // In this case we only need to disable the remaining ptav
                     const disabledPtavId = excludedCombination.find(
-                        (ptav) => !combination.includes(ptav)
+                        (ptav) => !combinationIds.has(ptav)
                     );
-                    const excludedPtav = ptavList.find(ptav => ptav.id === disabledPtavId)
-                    if (excludedPtav) {
-                        excludedPtav.excluded = true;
+                    if (disabledPtavId !== undefined) {
+                        excludedIds.add(disabledPtavId);
                     }
                 }
             }
         }
+        // The flags are written on the raw PTAVs, and each line with changed flags is notified
+        // once, so that an exclusion pass triggers a single render of the lines it changes,
+        // whatever their number of values.
+        const changedPtals = new Set();
+        for(const [ptavId, ptav] of ptavById) {
+            const excluded = excludedIds.has(ptavId);
+            if (ptav.excluded !== excluded) {
+                ptav.excluded = excluded;
+                changedPtals.add(ptalByPtavId.get(ptavId));
+            }
+        }
+        for (const ptal of changedPtals) {
+            ptal.attribute_values = [...toRaw(ptal).attribute_values];
+        }
         const checkedProducts = checked || [];
         for(const optionalProductTmpl of childProducts) {
              // if the product is not checked for exclusions
@@ -303,6 +724,47 @@ export class crmProductConfiguratorDialog extends Component {
             }
         }
     }
+    /**
+     * Return the exclusion index of the product: its raw PTAVs by id, the attribute line of each
+     * PTAV, and for each PTAV, the indexes of the archived combinations containing it. The index is built once per product and only
+     * rebuilt when its attribute lines or archived combinations are replaced.
+     */
+    _getExclusionIndex(product) {
+        const rawProduct = toRaw(product);
+        let index = this.exclusionIndexes.get(rawProduct);
+        if (
+            !index ||
+            index.attributeLines !== rawProduct.attribute_lines ||
+            index.archivedCombinations !== rawProduct.archived_combinations
+        ) {
+            const ptavById = new Map();
+            const ptalByPtavId = new Map();
+            for (const ptal of product.attribute_lines) {
+                for (const ptav of toRaw(ptal).attribute_values) {
+                    ptavById.set(ptav.id, toRaw(ptav));
+                    ptalByPtavId.set(ptav.id, ptal);
+                }
+            }
+            const archivedCombinationsByPtav = new Map();
+            (rawProduct.archived_combinations || []).forEach((combination, combinationIndex) => {
+                for (const ptavId of combination) {
+                    if (!archivedCombinationsByPtav.has(ptavId)) {
+                        archivedCombinationsByPtav.set(ptavId, []);
+                    }
+                    archivedCombinationsByPtav.get(ptavId).push(combinationIndex);
+                }
+            });
+            index = {
+                attributeLines: rawProduct.attribute_lines,
+                archivedCombinations: rawProduct.archived_combinations,
+                ptavById,
+                ptalByPtavId,
+                archivedCombinationsByPtav,
+            };
+            this.exclusionIndexes.set(rawProduct, index);
+        }
+        return index;
+    }
     /**
      * Return the product given his template id.
      */
@@ -359,6 +821,11 @@ export class crmProductConfiguratorDialog extends Component {
      * Confirm the current combination(s).
      */
     async onConfirm() {
+        await this.dataLoaded;
+        if (this.dataLoadingFailed) {
+            return;
+        }
+        await this._waitCombinationUpdates();
         if (!this.isPossibleConfiguration()) return;
 
         // Step 1: Dynamically create variant if needed
@@ -1,7 +1,17 @@
 /** @odoo-module */
 
-import { Component } from "@odoo/owl";
+import { Component, useRef, useState } from "@odoo/owl";
 import { formatCurrency } from "@web/core/currency";
+import { useThrottleForAnimation } from "@web/core/utils/timing";
+
+// Number of values above which the values of a line are rendered in a virtualized list.
+export const VIRTUAL_LIST_THRESHOLD = 100;
+// Height of the rows of the virtualized list, in px.
+const VIRTUAL_LIST_ROW_HEIGHT = 32;
+// Number of rows visible at once in the virtualized list.
+const VIRTUAL_LIST_VISIBLE_ROWS = 10;
+// Number of rows rendered beyond each edge of the visible ones, for the scrolling to stay smooth.
+const VIRTUAL_LIST_OVERSCAN_ROWS = 5;
 
 export class ProductTemplateAttributeLine extends Component {
     static template = "crmProductConfigurator.ptal";
@@ -29,6 +39,7 @@ export class ProductTemplateAttributeLine extends Component {
                     html_color: [Boolean, String], // backend sends 'false' when there is no color
                     image: [Boolean, String], // backend sends 'false' when there is no image set
                     is_custom: Boolean,
+                    price_extra: { type: Number, optional: true },
                     excluded: { type: Boolean, optional: true },
                 },
             },
@@ -42,6 +53,89 @@ export class ProductTemplateAttributeLine extends Component {
     };
 
     setup() {
+        this.virtualListRowHeight = VIRTUAL_LIST_ROW_HEIGHT;
+        this.virtualListHeight = VIRTUAL_LIST_ROW_HEIGHT * VIRTUAL_LIST_VISIBLE_ROWS;
+        this.state = useState({
+            // Type-ahead filter and scroll position of the virtualized list.
+            search: "",
+            scrollTop: 0,
+        });
+        this.virtualListRef = useRef("virtualList");
+        this.onVirtualListScroll = useThrottleForAnimation(() => {
+            this.state.scrollTop = this.virtualListRef.el.scrollTop;
+        });
+        // Values matching the type-ahead filter, only recomputed when the filter or the values
+        // change.
+        this.filteredPTAVs = { attributeValues: null, search: null, ptavs: [] };
+    }
+
+    /**
+     * Return whether the values of the line are rendered in a virtualized list, i.e. only the
+     * ones visible in the list, with a type-ahead filter.
+     */
+    isVirtualized() {
+        return this.props.attribute_values.length > VIRTUAL_LIST_THRESHOLD;
+    }
+
+    /**
+     * Filter the values of the virtualized list, scrolling back to its top.
+     */
+    onSearchInput(event) {
+        this.state.search = event.target.value;
+        this.state.scrollTop = 0;
+        if (this.virtualListRef.el) {
+            this.virtualListRef.el.scrollTop = 0;
+        }
+    }
+
+    /**
+     * Return the values matching the type-ahead filter.
+     */
+    getFilteredPTAVs() {
+        const { attribute_values } = this.props;
+        const filteredPTAVs = this.filteredPTAVs;
+        if (
+            filteredPTAVs.attributeValues !== attribute_values ||
+            filteredPTAVs.search !== this.state.search
+        ) {
+            const search = this.state.search.trim().toLowerCase();
+            filteredPTAVs.ptavs = search
+                ? attribute_values.filter(ptav => ptav.name.toLowerCase().includes(search))
+                : attribute_values;
+            filteredPTAVs.attributeValues = attribute_values;
+            filteredPTAVs.search = this.state.search;
+        }
+        return filteredPTAVs.ptavs;
+    }
+
+    /**
+     * Return the window of the virtualized list to render: the values around the visible ones,
+     * their offset in the list and the height of the whole list, in px.
+     */
+    getVirtualWindow() {
+        const ptavs = this.getFilteredPTAVs();
+        const start = Math.max(
+            0, Math.floor(this.state.scrollTop / VIRTUAL_LIST_ROW_HEIGHT) - VIRTUAL_LIST_OVERSCAN_ROWS
+        );
+        const end = Math.min(
+            ptavs.length, start + VIRTUAL_LIST_VISIBLE_ROWS + 2 * VIRTUAL_LIST_OVERSCAN_ROWS
+        );
+        return {
+            ptavs: ptavs.slice(start, end),
+            offset: start * VIRTUAL_LIST_ROW_HEIGHT,
+            height: ptavs.length * VIRTUAL_LIST_ROW_HEIGHT,
+        };
+    }
+
+    /**
+     * Return the names of the selected values, shown above the virtualized list since they may
+     * be scrolled or filtered out of it.
+     */
+    getSelectedPTAVNames() {
+        return this.props.attribute_values
+            .filter(ptav => this.props.selected_attribute_value_ids.includes(ptav.id))
+            .map(ptav => ptav.name)
+            .join(", ");
     }
 
     /**
@@ -66,6 +160,9 @@ export class ProductTemplateAttributeLine extends Component {
      * Return template name to use by checking the display type in the props.
      */
     getPTAVTemplate() {
+        if (this.isVirtualized()) {
+            return 'crmProductConfigurator.ptav-virtual';
+        }
         switch(this.props.attribute.display_type) {
             case 'color':
                 return 'crmProductConfigurator.ptav-color';
@@ -81,9 +178,33 @@ export class ProductTemplateAttributeLine extends Component {
     }
 
     /**
-     * Return the name of the PTAV
+     * Return the URL of the image of the PTAV.
+     *
+     * The backend sends the cache-busted URL of the image, or its base64 content when the images
+     * are not loaded lazily.
+     */
+    getPTAVImageURL(ptav) {
+        if (ptav.image.startsWith("/web/image/")) {
+            return ptav.image;
+        }
+        return `/web/image/product.template.attribute.value/${ptav.id}/image`;
+    }
+
+    /**
+     * Return the extra price of the PTAV, signed and in the format of the currency.
+     */
+    getFormattedPriceExtra(ptav) {
+        const sign = ptav.price_extra > 0 ? "+" : "-";
+        return `${sign} ${formatCurrency(Math.abs(ptav.price_extra), this.env.currencyId)}`;
+    }
+
+    /**
+     * Return the name of the PTAV, along with its extra price if any.
      */
     getPTAVSelectName(ptav) {
+        if (ptav.price_extra) {
+            return `${ptav.name} (${this.getFormattedPriceExtra(ptav)})`;
+        }
         return ptav.name;
     }
 
@@ -0,0 +1,142 @@
+/** @odoo-module **/
+
+import { describe, expect, test } from "@odoo/hoot";
+import {
+    crmProductConfiguratorDialog,
+} from "@crm_product_configurator/js/product_configurator_dialog/product_configurator_dialog";
+
+// Maximum duration of an exclusion pass on the synthetic template, in ms.
+const EXCLUSION_PASS_BUDGET = 50;
+
+/**
+ * Return a pseudo-random number generator, for the synthetic templates to be reproducible.
+ */
+function getRandom(seed) {
+    return () => {
+        seed = (seed * 1103515245 + 12345) % 2147483648;
+        return seed / 2147483648;
+    };
+}
+
+/**
+ * Return a synthetic product with `lineCount` lines of `valueCount` values, `exclusionCount`
+ * exclusions and `archivedCombinationCount` archived combinations.
+ */
+function getSyntheticProduct({ lineCount, valueCount, exclusionCount, archivedCombinationCount }) {
+    const random = getRandom(42);
+    const pick = (values) => values[Math.floor(random() * values.length)];
+    const attributeLines = [];
+    for (let lineIndex = 0; lineIndex < lineCount; lineIndex++) {
+        const attributeValues = [];
+        for (let valueIndex = 0; valueIndex < valueCount; valueIndex++) {
+            attributeValues.push({
+                id: lineIndex * valueCount + valueIndex + 1,
+                name: `Value ${lineIndex}.${valueIndex}`,
+                html_color: false,
+                image: false,
+                is_custom: false,
+                price_extra: 0,
+            });
+        }
+        attributeLines.push({
+            id: lineIndex + 1,
+            attribute: { id: lineIndex + 1, name: `Attribute ${lineIndex}`, display_type: "radio" },
+            attribute_values: attributeValues,
+            selected_attribute_value_ids: [attributeValues[0].id],
+            create_variant: "always",
+        });
+    }
+    const exclusions = {};
+    for (let index = 0; index < exclusionCount; index++) {
+        const [line, otherLine] = [pick(attributeLines), pick(attributeLines)];
+        if (line !== otherLine) {
+            const ptavId = pick(line.attribute_values).id;
+            exclusions[ptavId] = [...(exclusions[ptavId] || []), pick(otherLine.attribute_values).id];
+        }
+    }
+    const archivedCombinations = [];
+    for (let index = 0; index < archivedCombinationCount; index++) {
+        // Favor the first values, for the archived combinations to be close to the selected one.
+        archivedCombinations.push(attributeLines.map(
+            (ptal) => ptal.attribute_values[Math.floor(random() ** 4 * valueCount)].id
+        ));
+    }
+    return {
+        product_tmpl_id: 1,
+        attribute_lines: attributeLines,
+        exclusions,
+        archived_combinations: archivedCombinations,
+        parent_exclusions: {},
+        parent_product_tmpl_ids: [],
+    };
+}
+
+/**
+ * Return the ids of the excluded values of the product, computed by going through all the
+ * exclusions and archived combinations.
+ */
+function getExpectedExcludedIds(product) {
+    const combination = product.attribute_lines.flatMap((ptal) => ptal.selected_attribute_value_ids);
+    const excludedIds = new Set();
+    for (const ptavId of combination) {
+        for (const excludedId of product.exclusions[ptavId] || []) {
+            excludedIds.add(excludedId);
+        }
+    }
+    for (const archivedCombination of product.archived_combinations) {
+        const commonIds = archivedCombination.filter((ptavId) => combination.includes(ptavId));
+        if (commonIds.length === combination.length) {
+            commonIds.forEach((ptavId) => excludedIds.add(ptavId));
+        } else if (commonIds.length === combination.length - 1) {
+            excludedIds.add(archivedCombination.find((ptavId) => !combination.includes(ptavId)));
+        }
+    }
+    return excludedIds;
+}
+
+function getDialog(product) {
+    const dialog = Object.create(crmProductConfiguratorDialog.prototype);
+    dialog.state = { products: [product], optionalProducts: [] };
+    dialog.exclusionIndexes = new WeakMap();
+    return dialog;
+}
+
+describe.current.tags("headless");
+
+describe("product configurator exclusions", () => {
+    test("exclusions of a large template", () => {
+        const product = getSyntheticProduct({
+            lineCount: 3,
+            valueCount: 300,
+            exclusionCount: 2000,
+            archivedCombinationCount: 5000,
+        });
+        const dialog = getDialog(product);
+        const random = getRandom(7);
+        const durations = [];
+        for (let click = 0; click < 20; click++) {
+            // Select another value of a line, as a click on the line would.
+            const ptal = product.attribute_lines[click % product.attribute_lines.length];
+            ptal.selected_attribute_value_ids = [
+                ptal.attribute_values[Math.floor(random() ** 4 * ptal.attribute_values.length)].id,
+            ];
+            const start = performance.now();
+            dialog._checkExclusions(product);
+            durations.push(performance.now() - start);
+
+            const expectedExcludedIds = getExpectedExcludedIds(product);
+            const excludedIds = product.attribute_lines
+                .flatMap((ptal) => ptal.attribute_values)
+                .filter((ptav) => ptav.excluded)
+                .map((ptav) => ptav.id);
+            expect(excludedIds.sort((a, b) => a - b)).toEqual(
+                [...expectedExcludedIds].sort((a, b) => a - b)
+            );
+        }
+        // The first pass builds the exclusion index of the product.
+        const maxDuration = Math.max(...durations.slice(1));
+        expect(maxDuration < EXCLUSION_PASS_BUDGET).toBe(true, {
+            message: `exclusion pass took ${maxDuration.toFixed(1)}ms`,
+        });
+    });
+});
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+from . import test_combination_solver
+from . import test_configurator_benchmark
+from . import test_configurator_payload
+from . import test_crm_material_line_grid
+from . import test_product_variant
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import time
+
+from odoo import Command
+from odoo.tests import HttpCase
+
+from odoo.addons.crm_product_configurator.models.configurator_cache import payload_cache
+
+_logger = logging.getLogger(__name__)
+
+# Environment variable giving the directory the benchmark reports are written to, as JSON.
+BENCHMARK_REPORT_DIR_ENV = 'CRM_CONFIGURATOR_BENCHMARK_DIR'
+
+
+class ProductConfiguratorCommon(HttpCase):
+    """ Common class of the product configurator tests, generating synthetic catalogs and leads,
+    calling the configurator routes as a logged-in user and benchmarking them.
+
+    The benchmarks of each test class are logged as a JSON report when the class is done, and
+    written to `<class name>.json` in the directory given by the `CRM_CONFIGURATOR_BENCHMARK_DIR`
+    environment variable, if set, to be compared across commits.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.currency = cls.env.company.currency_id
+        cls.uom_unit = cls.env.ref('uom.product_uom_unit')
+        cls.benchmark_results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.benchmark_results:
+            report = json.dumps(
+                {'class': cls.__name__, 'benchmarks': cls.benchmark_results}, indent=2
+            )
+            _logger.info("Product configurator benchmark report:\n%s", report)
+            if report_dir := os.environ.get(BENCHMARK_REPORT_DIR_ENV):
+                os.makedirs(report_dir, exist_ok=True)
+                with open(os.path.join(report_dir, f'{cls.__name__}.json'), 'w') as report_file:
+                    report_file.write(report)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.authenticate('admin', 'admin')
+        payload_cache.invalidate()
+
+    @classmethod
+    def _create_configurator_template(
+            cls,
+            name,
+            line_count=2,
+            value_count=3,
+            create_variant='always',
+            exclusion_count=0,
+            archived_variant_count=0,
+            optional_product_count=0,
+    ):
+        """ Create a configurable template with the given numbers of attribute lines and values
+        per line. The values of the first line exclude values of the second one, and the first
+        variants are archived.
+
+        :param value_count: the number of values of each line, or a list of the numbers of values
+            of the lines.
+
+        :param str create_variant: the variant creation mode of the attributes.
+        :param int exclusion_count: the number of exclusions.
+        :param int archived_variant_count: the number of archived variants.
+        :param int optional_product_count: the number of optional products, without attributes.
+        :return: the `product.template`.
+        """
+        if isinstance(value_count, int):
+            value_count = [value_count] * line_count
+        attributes = cls.env['product.attribute'].create([{
+            'name': f"{name} Attribute {line_index}",
+            'create_variant': create_variant,
+            'value_ids': [
+                Command.create({'name': f"Value {line_index}.{value_index}"})
+                for value_index in range(value_count[line_index])
+            ],
+        } for line_index in range(line_count)])
+        template = cls.env['product.template'].create({
+            'name': name,
+            'list_price': 100.0,
+            'crm_enabled': True,
+            'product_config_mode': 'configurator',
+            'attribute_line_ids': [
+                Command.create({
+                    'attribute_id': attribute.id,
+                    'value_ids': [Command.set(attribute.value_ids.ids)],
+                }) for attribute in attributes
+            ],
+            'optional_product_ids': [Command.set(cls.env['product.template'].create([{
+                'name': f"{name} Option {option_index}",
+                'list_price': 10.0,
+            } for option_index in range(optional_product_count)]).ids)],
+        })
+        lines = template.attribute_line_ids
+        if exclusion_count and len(lines) > 1:
+            first_values = lines[0].product_template_value_ids
+            second_values = lines[1].product_template_value_ids
+            for index in range(exclusion_count):
+                first_values[index % len(first_values)].write({'exclude_for': [Command.create({
+                    'product_tmpl_id': template.id,
+                    'value_ids': [Command.link(second_values[(index + 1) % len(second_values)].id)],
+                })]})
+        if archived_variant_count:
+            template.product_variant_ids[:archived_variant_count].action_archive()
+        return template
+
+    def _get_values(self, product_template, **params):
+        """ Call the `get_values` route for the template. """
+        return self.make_jsonrpc_request('/crm_product_configurator/get_values', {
+            'product_template_id': product_template.id,
+            'quantity': 1.0,
+            'currency_id': self.currency.id,
+            'product_uom_id': self.uom_unit.id,
+            'company_id': self.env.company.id,
+            **params,
+        })
+
+    @classmethod
+    def _create_lead(cls, product_template, line_count):
+        """ Create a lead with `line_count` material lines of the variants of the template, each
+        variant being used in turn.
+
+        :return: the `crm.lead`.
+        """
+        lead = cls.env['crm.lead'].create({'name': f"{product_template.name} Lead"})
+        MaterialLine = cls.env['crm.material.line']
+        variants = product_template.product_variant_ids
+        MaterialLine.create([
+            dict(
+                MaterialLine._prepare_configurator_line_vals(
+                    variant,
+                    variant.product_template_attribute_value_ids.ids,
+                    1.0,
+                    cls.uom_unit,
+                ),
+                lead_id=lead.id,
+            ) for variant in (variants[index % len(variants)] for index in range(line_count))
+        ])
+        return lead
+
+    def _benchmark(self, name, func, **params):
+        """ Run `func` with empty caches, and record its number of queries and duration in the
+        benchmark report.
+
+        :param str name: the name of the benchmark.
+        :param params: the parameters of the benchmark, e.g. the size of the catalog, recorded
+            along with the measures.
+        :return: the result of `func`, its number of queries and its duration in ms.
+        :rtype: tuple
+        """
+        self.env.flush_all()
+        self.env.invalidate_all()
+        payload_cache.invalidate()
+        query_count = self.cr.sql_log_count
+        start = time.perf_counter()
+        result = func()
+        self.env.flush_all()
+        duration = (time.perf_counter() - start) * 1000
+        query_count = self.cr.sql_log_count - query_count
+        self.benchmark_results.append(
+            dict(name=name, params=params, query_count=query_count, duration=round(duration, 3))
+        )
+        return result, query_count, duration
+
+    def _count_queries(self, func):
+        """ Return the number of queries executed by `func`, run with empty caches. """
+        self.env.flush_all()
+        self.env.invalidate_all()
+        payload_cache.invalidate()
+        query_count = self.cr.sql_log_count
+        func()
+        return self.cr.sql_log_count - query_count
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import ProductConfiguratorCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCombinationSolver(ProductConfiguratorCommon):
+    """ Compare `_solve_first_possible_combination` with the enumeration of
+    `_get_first_possible_combination`, on a template whose first possible combination comes
+    after many impossible ones, and on a template with many variants.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.small_template = cls._create_configurator_template(
+            "Solver Small", line_count=2, value_count=2,
+        )
+        # The first 1500 combinations in the order of the lines and values are impossible: most
+        # of their variants are archived, the others are excluded.
+        cls.adversarial_template = cls._create_configurator_template(
+            "Solver Adversarial",
+            line_count=3,
+            value_count=[20, 20, 5],
+            exclusion_count=30,
+            archived_variant_count=1500,
+        )
+        cls.many_variants_template = cls._create_configurator_template(
+            "Solver Many Variants", line_count=4, value_count=10,
+        )
+
+    def _compare_with_enumeration(self, template, **params):
+        """ Benchmark the solver and the enumeration on the template, and check they find the same
+        combination.
+
+        :return: the number of queries of the solver.
+        """
+        # Compile the exclusion graph, which is kept on the template.
+        template._get_configurator_exclusion_graph()
+        solved_combination, query_count, _duration = self._benchmark(
+            '_solve_first_possible_combination',
+            template._solve_first_possible_combination,
+            **params,
+        )
+        enumerated_combination, _query_count, _duration = self._benchmark(
+            '_get_first_possible_combination',
+            template._get_first_possible_combination,
+            **params,
+        )
+        self.assertTrue(solved_combination)
+        self.assertEqual(solved_combination, enumerated_combination)
+        return query_count
+
+    def test_adversarial_template(self):
+        template = self.adversarial_template
+        self._compare_with_enumeration(template, variants=2000, archived=1500, exclusions=30)
+
+        combination = template._solve_first_possible_combination()
+        self.assertTrue(template._get_variant_for_combination(combination).active)
+
+    def test_many_variants_template(self):
+        """ Only the variant of the first solution is read: the number of queries doesn't depend
+        on the number of variants of the template.
+        """
+        small_query_count = self._compare_with_enumeration(self.small_template, variants=4)
+        query_count = self._compare_with_enumeration(self.many_variants_template, variants=10000)
+        self.assertEqual(query_count, small_query_count)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+from odoo.tests import tagged
+
+from .common import ProductConfiguratorCommon
+
+# Budgets of the benchmarked operations: their maximum number of queries. Their durations are
+# only recorded in the benchmark report, wall-clock times varying too much between test runners.
+BENCHMARK_BUDGETS = {
+    'get_values': {'queries': 100},
+    'update_combination': {'queries': 40},
+    'save_to_crm': {'queries': 80},
+    '_get_grid_matrix': {'queries': 60},
+    '_get_grid_commands': {'queries': 150},
+}
+# Environment variable overriding some of the budgets, as JSON, e.g.
+# `{"get_values": {"queries": 80, "duration": 500}}` to also check the durations, in ms, on a
+# dedicated benchmark runner.
+BENCHMARK_BUDGETS_ENV = 'CRM_CONFIGURATOR_BENCHMARK_BUDGETS'
+
+
+@tagged('post_install', '-at_install')
+class TestConfiguratorBenchmark(ProductConfiguratorCommon):
+    """ Benchmark the configurator routes and the grid of the leads on a generated catalog, and
+    check their number of queries against `BENCHMARK_BUDGETS`.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.budgets = {name: dict(budget) for name, budget in BENCHMARK_BUDGETS.items()}
+        for name, budget in json.loads(os.environ.get(BENCHMARK_BUDGETS_ENV) or '{}').items():
+            cls.budgets.setdefault(name, {}).update(budget)
+
+        cls.configurator_template = cls._create_configurator_template(
+            "Benchmark Configurator",
+            line_count=3,
+            value_count=[10, 10, 5],
+            exclusion_count=20,
+            archived_variant_count=50,
+            optional_product_count=5,
+        )
+        cls.grid_template = cls._create_configurator_template(
+            "Benchmark Grid", line_count=2, value_count=[20, 25],
+        )
+        cls.lead = cls._create_lead(cls.configurator_template, 200)
+
+    def _benchmark_within_budget(self, name, func, **params):
+        """ Benchmark `func`, see `_benchmark`, after a first run warming up the caches which
+        don't depend on the catalog, and check it stays within the budget of `name`.
+
+        :return: the result of `func`.
+        """
+        func()
+        budget = self.budgets[name]
+        with self.assertQueryCount(budget['queries']):
+            result, _query_count, duration = self._benchmark(name, func, **params)
+        if 'duration' in budget:
+            self.assertLessEqual(
+                duration, budget['duration'],
+                f"{name} took {duration:.0f} ms, more than its budget of {budget['duration']} ms",
+            )
+        return result
+
+    def _get_possible_combination(self, template):
+        """ Return the values of the last active variant of the template. """
+        return template.product_variant_ids[-1].product_template_attribute_value_ids
+
+    def test_get_values(self):
+        template = self.configurator_template
+        values = self._benchmark_within_budget(
+            'get_values',
+            lambda: self._get_values(template),
+            variants=len(template.with_context(active_test=False).product_variant_ids),
+            exclusions=20,
+        )
+
+        product = values['products'][0]
+        self.assertEqual(
+            [len(ptal['attribute_values']) for ptal in product['attribute_lines']], [10, 10, 5]
+        )
+        self.assertEqual(len(values['optional_products']), 5)
+        self.assertTrue(template._is_combination_possible(
+            self.env['product.template.attribute.value'].browse([
+                ptal['selected_attribute_value_ids'][0] for ptal in product['attribute_lines']
+            ])
+        ))
+
+    def test_update_combination(self):
+        template = self.configurator_template
+        combination = self._get_possible_combination(template)
+        values = self._benchmark_within_budget(
+            'update_combination',
+            lambda: self.make_jsonrpc_request('/crm_product_configurator/update_combination', {
+                'product_template_id': template.id,
+                'combination': combination.ids,
+                'quantity': 2.0,
+                'currency_id': self.currency.id,
+                'product_uom_id': self.uom_unit.id,
+                'company_id': self.env.company.id,
+            }),
+            values=len(combination),
+        )
+
+        self.assertEqual(values['id'], template.product_variant_ids[-1].id)
+        self.assertIn('price', values)
+
+    def test_save_to_crm(self):
+        template = self.configurator_template
+        variant = template.product_variant_ids[-1]
+        optional_variants = template.optional_product_ids.product_variant_ids
+        lead_line_count = len(self.lead.material_line_ids)
+        new_line_count = len(optional_variants) + (
+            0 if variant in self.lead.material_line_ids.product_id else 1
+        )
+
+        def save_to_crm():
+            return self.make_jsonrpc_request('/crm_product_configurator/save_to_crm', {
+                'main_product': {
+                    'product_id': variant.id,
+                    'product_template_id': template.id,
+                    'quantity': 3.0,
+                    'ptav_ids': variant.product_template_attribute_value_ids.ids,
+                },
+                'optional_products': [{
+                    'product_id': optional_variant.id,
+                    'product_template_id': optional_variant.product_tmpl_id.id,
+                    'quantity': 1.0,
+                    'ptav_ids': [],
+                } for optional_variant in optional_variants],
+                'crm_lead_id': self.lead.id,
+            })
+
+        result = self._benchmark_within_budget(
+            'save_to_crm',
+            save_to_crm,
+            lead_lines=lead_line_count,
+            products=1 + len(optional_variants),
+        )
+
+        self.assertEqual(result, {'success': True})
+        # The second save updates the lines created by the first one.
+        lines = self.lead.material_line_ids
+        self.assertEqual(len(lines), lead_line_count + new_line_count)
+        self.assertEqual(
+            set(lines.filtered(lambda line: line.product_id in optional_variants).mapped('quantity')),
+            {1.0},
+        )
+
+    def test_get_grid_matrix(self):
+        template = self.grid_template
+        lead = self._create_lead(template, 500)
+        matrix = self._benchmark_within_budget(
+            '_get_grid_matrix',
+            lambda: lead.material_line_ids._get_grid_matrix(template),
+            cells=len(template.product_variant_ids),
+            lines=500,
+        )
+
+        cells = [cell for row in matrix['matrix'] for cell in row if not cell.get('name')]
+        self.assertEqual(len(cells), 20 * 25)
+        self.assertEqual(sum(cell.get('qty', 0) for cell in cells), 500)
+
+    def test_get_grid_commands(self):
+        template = self.grid_template
+        lead = self.env['crm.lead'].create({'name': "Benchmark Grid Lead"})
+        matrix = lead.material_line_ids._get_grid_matrix(template)
+        cells = [cell for row in matrix['matrix'] for cell in row if not cell.get('name')]
+
+        def apply_grid(qty):
+            lead.write({'material_line_ids': lead.material_line_ids._get_grid_commands(
+                template, [dict(ptav_ids=cell['ptav_ids'], qty=qty) for cell in cells],
+            )})
+
+        # The warm-up run creates the lines of all the cells, the benchmarked one updates them.
+        quantities = iter((1, 2))
+        self._benchmark_within_budget(
+            '_get_grid_commands', lambda: apply_grid(next(quantities)), cells=len(cells),
+        )
+
+        self.assertEqual(len(lead.material_line_ids), len(cells))
+        self.assertEqual(set(lead.material_line_ids.mapped('quantity')), {2})
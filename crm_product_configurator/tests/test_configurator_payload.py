@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from odoo.addons.crm_product_configurator.models.configurator_cache import payload_cache
+
+from .common import ProductConfiguratorCommon
+
+
+@tagged('post_install', '-at_install')
+class TestConfiguratorPayload(ProductConfiguratorCommon):
+
+    def test_get_values_query_count_is_flat(self):
+        """ The attribute lines, attributes and values of a template are read in bulk, so that the
+        number of queries of `get_values` doesn't depend on the number of values.
+        """
+        # The attributes don't create variants, for the templates to have a single variant
+        # whatever their number of values.
+        small_template = self._create_configurator_template(
+            "Small", line_count=4, value_count=5, create_variant='no_variant',
+            optional_product_count=2,
+        )
+        large_template = self._create_configurator_template(
+            "Large", line_count=4, value_count=50, create_variant='no_variant',
+            optional_product_count=2,
+        )
+        # Warm up the caches which don't depend on the template, e.g. the ormcaches.
+        self._get_values(self._create_configurator_template(
+            "Warm-up", line_count=1, create_variant='no_variant',
+        ))
+
+        small_query_count = self._count_queries(lambda: self._get_values(small_template))
+        with self.assertQueryCount(small_query_count):
+            self.env.invalidate_all()
+            payload_cache.invalidate()
+            values = self._get_values(large_template)
+
+        attribute_lines = values['products'][0]['attribute_lines']
+        self.assertEqual(len(attribute_lines), 4)
+        self.assertEqual([len(ptal['attribute_values']) for ptal in attribute_lines], [50] * 4)
+        self.assertEqual(
+            set(attribute_lines[0]['attribute_values'][0]),
+            {'id', 'name', 'html_color', 'image', 'is_custom', 'price_extra'},
+        )
+
+    def test_snapshot_trigger(self):
+        """ The snapshots are scheduled once per transaction, and only when the changes of the
+        templates affect them.
+        """
+        template = self._create_configurator_template("Snapshot")
+        cron = self.env.ref('crm_product_configurator.ir_cron_compile_configurator_snapshots')
+        CronTrigger = self.env['ir.cron.trigger']
+        self.env.cr.precommit.run()
+        trigger_count = CronTrigger.search_count([('cron_id', '=', cron.id)])
+
+        template.description_sale = "Not in the snapshot"
+        self.env.cr.precommit.run()
+        self.assertEqual(CronTrigger.search_count([('cron_id', '=', cron.id)]), trigger_count)
+
+        template.attribute_line_ids[0].value_ids = template.attribute_line_ids[0].value_ids[:2]
+        template.attribute_line_ids[1].product_template_value_ids[0].price_extra = 10.0
+        template.crm_enabled = True
+        self.env.cr.precommit.run()
+        self.assertEqual(CronTrigger.search_count([('cron_id', '=', cron.id)]), trigger_count + 1)
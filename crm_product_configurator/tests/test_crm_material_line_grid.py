@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import ProductConfiguratorCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCrmMaterialLineGrid(ProductConfiguratorCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.small_grid_template = cls._create_configurator_template(
+            "Small Grid", line_count=2, value_count=5,
+        )
+        cls.large_grid_template = cls._create_configurator_template(
+            "Large Grid", line_count=2, value_count=[20, 30],
+        )
+
+    def _get_cells(self, matrix):
+        return [cell for row in matrix['matrix'] for cell in row if not cell.get('name')]
+
+    def test_get_grid_matrix_quantities(self):
+        """ The quantity of each cell is the sum of the quantities of the lines of its
+        combination.
+        """
+        # Two lines per variant of the template.
+        variants = self.small_grid_template.product_variant_ids
+        lead = self._create_lead(self.small_grid_template, 2 * len(variants))
+        lead.material_line_ids[0].quantity = 5.0
+
+        cells = self._get_cells(
+            lead.material_line_ids._get_grid_matrix(self.small_grid_template)
+        )
+
+        self.assertEqual(len(cells), len(variants))
+        first_line = lead.material_line_ids[0]
+        for cell in cells:
+            combination_key = self.env['crm.material.line']._get_combination_key(cell['ptav_ids'])
+            self.assertEqual(
+                cell['qty'], 7.0 if combination_key == first_line.combination_key else 2.0
+            )
+
+    def test_get_grid_matrix_scaling(self):
+        """ The cells are filled from the quantities summed once per call: the number of queries
+        doesn't depend on the number of lines of the lead.
+        """
+        query_counts = {}
+        for template in (self.small_grid_template, self.large_grid_template):
+            for line_count in (50, 500):
+                lead = self._create_lead(template, line_count)
+                _matrix, query_counts[template, line_count], _duration = self._benchmark(
+                    '_get_grid_matrix',
+                    lambda: lead.material_line_ids._get_grid_matrix(template),
+                    cells=len(template.product_variant_ids),
+                    lines=line_count,
+                )
+            self.assertEqual(query_counts[template, 50], query_counts[template, 500])
+
+    def test_get_grid_commands(self):
+        """ All the changed cells are applied at once: the lines of the new combinations are
+        created, the others updated or removed.
+        """
+        for template in (self.small_grid_template, self.large_grid_template):
+            variants = template.product_variant_ids
+            lead = self._create_lead(template, 2)
+            updated_line, removed_line = lead.material_line_ids
+            cells = self._get_cells(lead.material_line_ids._get_grid_matrix(template))
+            changes = []
+            for cell in cells:
+                combination_key = self.env['crm.material.line']._get_combination_key(
+                    cell['ptav_ids']
+                )
+                if combination_key == removed_line.combination_key:
+                    changes.append(dict(ptav_ids=cell['ptav_ids'], qty=0))
+                elif combination_key == updated_line.combination_key:
+                    changes.append(dict(ptav_ids=cell['ptav_ids'], qty=3))
+                else:
+                    changes.append(dict(ptav_ids=cell['ptav_ids'], qty=1))
+            self._benchmark(
+                '_get_grid_commands',
+                lambda: lead.write({'material_line_ids': lead.material_line_ids._get_grid_commands(
+                    template, changes
+                )}),
+                cells=len(changes),
+            )
+
+            self.assertFalse(removed_line.exists())
+            self.assertEqual(updated_line.quantity, 3)
+            self.assertEqual(len(lead.material_line_ids), len(variants) - 1)
+            self.assertEqual(
+                sum(lead.material_line_ids.mapped('quantity')), 3 + len(variants) - 2
+            )
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+import psycopg2
+
+from odoo.tests import tagged
+from odoo.tools import mute_logger
+
+from .common import ProductConfiguratorCommon
+
+
+@tagged('post_install', '-at_install')
+class TestProductVariant(ProductConfiguratorCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.dynamic_template = cls._create_configurator_template(
+            "Dynamic", line_count=2, value_count=2, create_variant='dynamic',
+        )
+        cls.combination = cls.dynamic_template.attribute_line_ids.mapped(
+            lambda line: line.product_template_value_ids[0]
+        )
+
+    def test_get_or_create_product_variant(self):
+        """ The variant of a dynamic combination is created once, then found. """
+        template = self.dynamic_template
+        self.assertFalse(template.product_variant_ids)
+
+        variant = template._get_or_create_product_variant(self.combination)
+
+        self.assertTrue(variant.active)
+        self.assertEqual(variant.product_template_attribute_value_ids, self.combination)
+        self.assertEqual(template._get_or_create_product_variant(self.combination), variant)
+        self.assertEqual(template.product_variant_ids, variant)
+
+    def test_get_or_create_product_variant_created_concurrently(self):
+        """ A variant committed by a concurrent transaction after the snapshot of the request is
+        missed by the lookups. Its creation breaks the unique index on the combination, which is
+        raised as a serialization failure for the request to be retried.
+        """
+        template = self.dynamic_template
+        variant = template._get_or_create_product_variant(self.combination)
+        self.env.flush_all()
+        self.env.invalidate_all()
+
+        ProductTemplate = type(template)
+        with patch.object(
+            ProductTemplate, '_get_variant_for_combination',
+            lambda self, combination: self.env['product.product'],
+        ), patch.object(
+            ProductTemplate, '_get_variants_for_combinations', lambda self, combinations: {},
+        ), mute_logger('odoo.sql_db'), self.assertRaises(psycopg2.errors.SerializationFailure):
+            template._get_or_create_product_variant(self.combination)
+
+        # Only the failed creation is rolled back.
+        self.env.invalidate_all()
+        self.assertEqual(template.product_variant_ids, variant)